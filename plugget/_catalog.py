@@ -0,0 +1,172 @@
+"""
+Catalog sources: a single gzipped JSON-lines file containing every manifest of a manifest repo
+
+Instead of cloning the manifest repo, plugget downloads the catalog with a conditional GET,
+and parses it in a single pass. Every line is a json object with the format:
+{"app": "blender", "package_name": "bqt", "version": "0.1.0", "manifest": {...}}
+
+The manifests are saved to the source folder in the same layout as a manifest repo,
+app_name/package_name/version.json, so the rest of plugget can treat it like any other source.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import shutil
+from pathlib import Path
+
+from plugget import settings
+from plugget._utils import safe_extract_path, swap_dir
+from plugget import _index
+from plugget import _transport
+
+
+CATALOG_SUFFIXES = (".jsonl.gz", ".jsonl")
+_HEADERS_FILE = "_CATALOG_HEADERS.json"  # etag & last-modified of the downloaded catalog
+
+
+def is_catalog_url(source_url: str) -> bool:
+    """a source is a catalog if it points to a .jsonl(.gz) file, local path or URL"""
+    return str(source_url).lower().endswith(CATALOG_SUFFIXES)
+
+
+def source_dir_name(source_url: str) -> str:
+    """
+    get the folder name for a catalog source, with a hash of the url
+    so it doesn't clash with a git source or another catalog with the same name, e.g. plugget-pkgs_1a2b3c4d5e6f
+    """
+    name = str(source_url).replace("\\", "/").rstrip("/").split("/")[-1].split(".")[0]
+    return f"{name}_{hashlib.sha256(str(source_url).encode()).hexdigest()[:12]}"
+
+
+def _is_safe_name(value) -> bool:
+    """True if a catalog value can be used as a single folder or file name, e.g. no '../'"""
+    return isinstance(value, str) and value not in ("", ".", "..") and not any(x in value for x in ("/", "\\", ":"))
+
+
+def _local_catalog_path(source_url: str) -> "Path|None":
+    """get the path if the catalog is a local file, None if it's a URL"""
+    if source_url.startswith("file://"):
+        return Path(source_url[len("file://"):])
+    if "://" in source_url:
+        return None
+    return Path(source_url)
+
+
+def _decompress(data: bytes, source_url: str) -> bytes:
+    if str(source_url).lower().endswith(".gz"):
+        return gzip.decompress(data)
+    return data
+
+
+def _download_catalog(source_url: str, cached_headers: dict) -> "tuple[bytes|None, dict]":
+    """
+    download the catalog, returns (None, cached_headers) if the catalog didn't change since last download
+    """
+    local_path = _local_catalog_path(source_url)
+    if local_path:
+        # local catalogs use the modified time instead of an etag
+        modified = str(local_path.stat().st_mtime_ns)
+        if cached_headers.get("mtime") == modified:
+            return None, cached_headers
+        return local_path.read_bytes(), {"mtime": modified}
+
+    headers = {}
+    if cached_headers.get("etag"):
+        headers["If-None-Match"] = cached_headers["etag"]
+    if cached_headers.get("last-modified"):
+        headers["If-Modified-Since"] = cached_headers["last-modified"]
+
+    # the catalog keeps its own etag next to the manifests, so we don't store the catalog twice in the http cache
+    response = _transport.get(source_url, headers=headers, use_cache=False, timeout=settings.source_timeout)
+    if response.status_code == 304:
+        logging.debug(f"catalog not modified: '{source_url}'")
+        return None, cached_headers
+    response.raise_for_status()
+
+    new_headers = {"etag": response.headers.get("ETag"), "last-modified": response.headers.get("Last-Modified")}
+    return response.content, new_headers
+
+
+def fetch_catalog(source_url: str, source_dir: Path) -> None:
+    """
+    download the catalog if it changed, and save its manifests & index to the source_dir
+    """
+    source_dir = Path(source_dir)
+    headers_path = source_dir / _HEADERS_FILE
+    cached_headers = {}
+    if headers_path.exists() and (source_dir / "_LAST_COMMIT").exists():
+        cached_headers = json.loads(headers_path.read_text())
+
+    data, headers = _download_catalog(source_url, cached_headers)
+    if data is None:
+        return
+
+    revision = hashlib.sha256(data).hexdigest()
+    last_commit_path = source_dir / "_LAST_COMMIT"
+    if last_commit_path.exists() and last_commit_path.read_text().strip() == revision:
+        # e.g. the server doesn't support conditional requests, but the content didn't change
+        headers_path.write_text(json.dumps(headers))
+        return
+
+    # write the manifests to a new folder, then swap it with the old one
+    # so deleted manifests don't linger, and a failed parse keeps the old source
+    new_dir = source_dir.with_name(f"{source_dir.name}_new")
+    shutil.rmtree(new_dir, ignore_errors=True)
+    new_root = new_dir.resolve()
+    entries = []
+    for line in _decompress(data, source_url).splitlines():
+        if not line.strip():
+            continue
+        item = json.loads(line)
+        app, package_name, version = item["app"], item["package_name"], item["version"]
+        # the values come from a remote file, don't let them write outside the source folder
+        if not all(_is_safe_name(x) for x in (app, package_name, version)):
+            logging.warning(f"skipping catalog entry with invalid name: {app}/{package_name}/{version}")
+            continue
+        manifest_path = Path(app) / package_name / f"{version}.json"
+        dest_path = safe_extract_path(new_root, manifest_path.as_posix())
+        dest_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(dest_path, "w") as f:
+            json.dump(item["manifest"], f, indent=4)
+        entries.append(_index.make_entry(app, package_name, version, manifest_path.as_posix(), item["manifest"]))
+
+    new_dir.mkdir(parents=True, exist_ok=True)
+    (new_dir / _HEADERS_FILE).write_text(json.dumps(headers))
+    (new_dir / "_LAST_COMMIT").write_text(revision)
+
+    swap_dir(new_dir, source_dir)
+
+    # we parsed every manifest already, so save the index now instead of on the next search
+    _index.save_index(source_dir, entries, revision)
+    logging.info(f"loaded {len(entries)} manifests from catalog '{source_url}'")
+
+
+def build_catalog(source_dir: Path, catalog_path: Path) -> Path:
+    """
+    save all manifests in a manifest repo folder to a single catalog file
+    source_dir: folder with the layout app_name/package_name/version.json
+    catalog_path: the catalog to create, gzipped if it ends with .gz
+    """
+    source_dir = Path(source_dir)
+    catalog_path = Path(catalog_path)
+
+    lines = []
+    for app_dir in sorted(source_dir.iterdir()):
+        if not app_dir.is_dir() or app_dir.name.startswith("."):  # skip .git
+            continue
+        for manifest_path in sorted(app_dir.glob("*/*.json")):
+            with open(manifest_path, "r") as f:
+                manifest = json.load(f)
+            item = {"app": app_dir.name, "package_name": manifest_path.parent.name,
+                    "version": manifest_path.stem, "manifest": manifest}
+            lines.append(json.dumps(item, separators=(",", ":")))
+
+    data = ("\n".join(lines) + "\n").encode()
+    if catalog_path.suffix.lower() == ".gz":
+        data = gzip.compress(data)
+    catalog_path.parent.mkdir(parents=True, exist_ok=True)
+    catalog_path.write_bytes(data)
+    print(f"saved {len(lines)} manifests to catalog '{catalog_path}'")
+    return catalog_path
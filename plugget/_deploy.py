@@ -0,0 +1,261 @@
+"""
+Deploy package content from the download cache to an app folder, without copying the file data when possible
+
+1. reflink: a copy-on-write clone (btrfs, xfs, APFS, ...), an independent file that shares the data on disk until edited
+2. hardlink: the same file on disk, in 2 folders (same drive only), opt-in
+3. copy: a normal copy, if the above aren't supported
+
+so installing a big asset pack is near-instant and uses no extra disk space, and the cache stays intact.
+settings.deploy_mode picks the methods: "auto" (reflink or copy), "hardlink" (reflink, hardlink or copy), "copy" (copy only).
+Hardlinked files are the same files as the cache, editing an installed file edits the cache too.
+Only use "hardlink" if the installed files are never edited, e.g. by an addon saving settings next to itself.
+
+sync() deploys only the difference with a previous install, using a ledger of the installed files saved on install.
+"""
+
+import errno
+import hashlib
+import logging
+import os
+import shutil
+import sys
+import threading
+from pathlib import Path
+
+from plugget import settings
+from plugget._utils import rmdir
+
+
+_FICLONE = 0x40049409  # linux ioctl to clone a file, see 'man ioctl_ficlone'
+_METHODS = {"auto": ("reflink", "copy"), "reflink": ("reflink", "copy"), "hardlink": ("reflink", "hardlink", "copy"),
+            "copy": ("copy",)}  # "reflink" is the same as "auto", kept for old settings
+
+_unsupported = set()  # (method, source device, target device), so we don't retry failing methods for every file
+_unsupported_lock = threading.Lock()
+_clonefile = None  # macOS libc clonefile, loaded on first use
+
+
+def _reflink_linux(src: str, dst: str) -> None:
+    import fcntl
+    with open(src, "rb") as src_file, open(dst, "wb") as dst_file:
+        try:
+            fcntl.ioctl(dst_file.fileno(), _FICLONE, src_file.fileno())
+        except OSError:
+            dst_file.close()
+            os.unlink(dst)
+            raise
+
+
+def _reflink_macos(src: str, dst: str) -> None:
+    global _clonefile
+    if _clonefile is None:
+        import ctypes
+        libc = ctypes.CDLL("libc.dylib", use_errno=True)
+        _clonefile = libc.clonefile
+        _clonefile.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_int]
+    if _clonefile(os.fsencode(src), os.fsencode(dst), 0) != 0:
+        import ctypes
+        error = ctypes.get_errno()
+        raise OSError(error, os.strerror(error))
+
+
+def _reflink(src: str, dst: str) -> None:
+    if sys.platform.startswith("linux"):
+        _reflink_linux(src, dst)
+    elif sys.platform == "darwin":
+        _reflink_macos(src, dst)
+    else:
+        raise OSError(errno.EOPNOTSUPP, "reflinks are not supported on this platform")
+
+
+def _deploy_file(src: Path, dst: Path, methods: "tuple[str]") -> str:
+    """deploy a single file with the first method that works, and return the method name"""
+    devices = (os.stat(src).st_dev, os.stat(dst.parent).st_dev)
+    for method in methods:
+        if (method, *devices) in _unsupported:
+            continue
+        try:
+            if method == "reflink":
+                _reflink(str(src), str(dst))
+                shutil.copystat(src, dst)
+            elif method == "hardlink":
+                os.link(src, dst)
+            else:
+                shutil.copy2(src, dst)
+            return method
+        except OSError as e:
+            if method == "copy":
+                raise
+            logging.debug(f"{method} not supported from '{src}' to '{dst.parent}', falling back: {e}")
+            with _unsupported_lock:
+                _unsupported.add((method, *devices))
+    raise OSError(f"failed to deploy '{src}' to '{dst}'")
+
+
+def _remove(path: Path) -> None:
+    rmdir(path, wait=not path.is_dir())  # big folders are deleted in the background
+
+
+def deploy(src: "Path|str", dst: "Path|str", overwrite: bool = True, mode: str = None) -> Path:
+    """
+    deploy a file or folder from src to dst, without copying the data if possible
+    src: file or folder, stays intact
+    dst: the new path, not the parent folder. e.g. deploy(cache/my_addon, addons/my_addon)
+    overwrite: remove dst if it exists, else raise FileExistsError
+    mode: see settings.deploy_mode
+    returns dst
+    """
+    src, dst = Path(src), Path(dst)
+    methods = _METHODS[mode or settings.deploy_mode]
+
+    if dst.exists() or dst.is_symlink():
+        if not overwrite:
+            raise FileExistsError(f"'{dst}' already exists")
+        _remove(dst)
+    dst.parent.mkdir(parents=True, exist_ok=True)
+
+    if not src.is_dir():
+        _deploy_file(src, dst, methods)
+        return dst
+
+    used = {}
+    for root, dirs, files in os.walk(src):
+        root_dst = dst / os.path.relpath(root, src)
+        root_dst.mkdir(parents=True, exist_ok=True)
+        for name in [d for d in dirs if (Path(root) / d).is_symlink()]:  # os.walk doesn't follow folder links
+            os.symlink(os.readlink(Path(root) / name), root_dst / name)
+        for name in files:
+            file_src = Path(root) / name
+            if file_src.is_symlink():
+                os.symlink(os.readlink(file_src), root_dst / name)
+                continue
+            method = _deploy_file(file_src, root_dst / name, methods)
+            used[method] = used.get(method, 0) + 1
+    logging.debug(f"deployed '{src}' to '{dst}': {used}")
+    return dst
+
+
+def _hash_file(path: Path, chunk_size: int = 1024 * 1024) -> str:
+    if path.is_symlink():
+        return "link:" + os.readlink(path)
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def hash_files(path: "Path|str") -> "dict[str, str]":
+    """
+    get the sha256 of every file in a file or folder, {relative posix path: sha256}
+    a single file uses the key '.'
+    """
+    return {relative_path: _hash_file(file_path) for relative_path, file_path in iter_files(path)}
+
+
+def content_sha256(path: "Path|str") -> str:
+    """
+    a single sha256 for the content of a file or folder, from the relative path & sha256 of every file
+    the same for the same files, however they were downloaded, e.g. git clone or git archive
+    """
+    lines = [f"{relative_path} {file_hash}" for relative_path, file_hash in sorted(hash_files(path).items())]
+    return hashlib.sha256("\n".join(lines).encode()).hexdigest()
+
+
+def iter_files(path: "Path|str") -> "Generator[tuple[str, Path]]":
+    """yield (relative posix path, path) for every file & link in a file or folder, a single file uses '.'"""
+    path = Path(path)
+    if not path.is_dir() or path.is_symlink():
+        yield ".", path
+        return
+    for root, dirs, files in os.walk(path):
+        names = files + [d for d in dirs if (Path(root) / d).is_symlink()]
+        for name in names:
+            file_path = Path(root) / name
+            yield file_path.relative_to(path).as_posix(), file_path
+
+
+def _stat(path: Path) -> "list[int]":
+    stat = os.lstat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _ledger_entry(entry: "dict|str|None") -> dict:
+    """ledger entries used to be a sha256 string, without the stat of the installed file"""
+    if isinstance(entry, str):
+        return {"sha256": entry, "stat": None}
+    return entry or {}
+
+
+def _is_unchanged(file_dst: Path, file_hash: str, previous: dict) -> bool:
+    """True if the installed file is the file we installed before (not edited or deleted), with the same content"""
+    if not previous or not (file_dst.exists() or file_dst.is_symlink()):
+        return False
+    if previous.get("stat") != _stat(file_dst):
+        return False  # edited since it was installed
+    previous_hash = previous.get("sha256") or _hash_file(file_dst)  # not hashed on install, hash it now
+    return previous_hash == file_hash
+
+
+def _remove_empty_parents(path: Path, root: Path) -> None:
+    parent = path.parent
+    while parent != root and root in parent.parents:
+        try:
+            parent.rmdir()  # only removes empty folders
+        except OSError:
+            break
+        parent = parent.parent
+
+
+def sync(src: "Path|str", dst: "Path|str", previous: dict = None, mode: str = None,
+         hashes: "dict[str, str]" = None) -> "dict[str, dict]":
+    """
+    deploy src to dst, as a diff with the previous install of dst
+    adds new files, replaces changed files, removes deleted files, and leaves unchanged files untouched.
+    installed files that were edited or deleted since the previous install are replaced.
+    files in dst that weren't installed by us (not in previous) are left as is, e.g. user settings.
+    previous: the ledger of the previous install. if None, dst is replaced completely
+    hashes: the sha256 of the files in src if known, see hash_files. only hashed if needed for the diff
+    returns the new ledger, {relative posix path: {"sha256": sha256 or None, "stat": [size, mtime]}}
+    """
+    src, dst = Path(src), Path(dst)
+    single_file = not src.is_dir() or src.is_symlink()
+    if previous is None or not (dst.exists() or dst.is_symlink()) or single_file != (not dst.is_dir()):
+        # a fresh install doesn't need the file hashes, so we don't read all the content
+        deploy(src, dst, overwrite=True, mode=mode)
+        hashes = hashes or {}
+        return {relative_path: {"sha256": hashes.get(relative_path),
+                                "stat": _stat(dst if single_file else dst / relative_path)}
+                for relative_path, _ in iter_files(src)}
+
+    hashes = hashes or hash_files(src)
+    methods = _METHODS[mode or settings.deploy_mode]
+    counts = {"added": 0, "changed": 0, "removed": 0, "unchanged": 0}
+    # remove deleted files first, in case a deleted file is replaced by a folder with the same name
+    for relative_path in set(previous) - set(hashes):
+        file_dst = dst / relative_path
+        if file_dst.is_symlink() or file_dst.is_file():
+            file_dst.unlink()
+            counts["removed"] += 1
+            _remove_empty_parents(file_dst, dst)
+
+    ledger = {}
+    for relative_path, file_hash in hashes.items():
+        file_src = src if single_file else src / relative_path
+        file_dst = dst if single_file else dst / relative_path
+        if _is_unchanged(file_dst, file_hash, _ledger_entry(previous.get(relative_path))):
+            counts["unchanged"] += 1
+        else:
+            exists = file_dst.exists() or file_dst.is_symlink()
+            counts["changed" if exists else "added"] += 1
+            if exists:
+                _remove(file_dst)
+            file_dst.parent.mkdir(parents=True, exist_ok=True)
+            if file_src.is_symlink():
+                os.symlink(os.readlink(file_src), file_dst)
+            else:
+                _deploy_file(file_src, file_dst, methods)
+        ledger[relative_path] = {"sha256": file_hash, "stat": _stat(file_dst)}
+
+    logging.info(f"synced '{src}' to '{dst}': {counts}")
+    return ledger
@@ -0,0 +1,218 @@
+"""
+Persistent manifest index for Plugget sources
+
+Instead of walking every app & package folder, and parsing every manifest on each search,
+we save a small index per source, with the fields we need to query packages.
+The index is rebuilt only when the source revision changes (e.g. a new commit in the manifest repo).
+"""
+
+import bisect
+import hashlib
+import json
+import logging
+import re
+import zlib
+from pathlib import Path
+
+from plugget import settings
+
+
+INDEX_DIR = settings.TEMP_PLUGGET / "_index"
+INDEX_VERSION = 2  # bump when the index layout changes, to force a rebuild
+
+# manifest fields saved in the index, next to app, package_name, version and manifest_path
+INDEXED_FIELDS = ["repo_url", "repo_SHA", "repo_tag", "description", "tags", "author"]
+# fields used for full text search, and their weight when ranking results
+SEARCH_FIELDS = {"package_name": 10, "tags": 5, "author": 3, "description": 1}
+PREFIX_MATCH_WEIGHT = 0.5  # a prefix match, e.g. 'tex' for 'textools', scores half of a full token match
+
+_loaded_indexes = {}  # in memory cache, source_dir: (revision, entries, (postings, sorted tokens))
+
+
+def _index_path(source_dir: Path) -> Path:
+    """get the index path for a source, unique per source folder"""
+    source_dir = Path(source_dir)
+    source_hash = hex(zlib.crc32(str(source_dir.resolve()).encode()) & 0xFFFFFFFF)[2:]
+    return INDEX_DIR / f"{source_dir.name}_{source_hash}.json"
+
+
+def _stat_fingerprint(source_dir: Path) -> str:
+    """hash of the modified time of the folders & manifests, and the size of the manifests"""
+    # adding or removing a manifest changes the mtime of the package folder, editing a manifest its mtime & size
+    stats = []
+    for app_dir in sorted(source_dir.iterdir()):
+        if not app_dir.is_dir() or app_dir.name.startswith("."):
+            continue
+        stats.append((app_dir.name, app_dir.stat().st_mtime_ns))
+        for package_dir in sorted(app_dir.iterdir()):
+            if not package_dir.is_dir():
+                continue
+            stats.append((package_dir.name, package_dir.stat().st_mtime_ns))
+            for manifest_path in sorted(package_dir.glob("*.json")):
+                stat = manifest_path.stat()
+                stats.append((manifest_path.name, stat.st_mtime_ns, stat.st_size))
+    return hashlib.sha256(str(stats).encode()).hexdigest()[:16]
+
+
+def source_revision(source_dir: Path) -> str:
+    """
+    get a string that changes when the content of the source changes
+    manifest repos cloned by plugget use the commit hash,
+    local folders (and local git repos, which can have uncommitted changes) use the modified time of the manifests
+    """
+    source_dir = Path(source_dir)
+    # cloned manifest repos record their commit on refresh, see commands._refresh_manifest_repo
+    # catalog sources record the hash of the catalog, see plugget._catalog
+    # plugget doesn't edit these, so the commit is enough
+    if (source_dir / "_LAST_COMMIT").exists():
+        return (source_dir / "_LAST_COMMIT").read_text().strip()
+    return _stat_fingerprint(source_dir)
+
+
+def _entry_from_manifest(source_dir: Path, manifest_path: Path) -> "dict|None":
+    """read the indexed fields from a manifest file"""
+    try:
+        with open(manifest_path, "r") as f:
+            data = json.load(f)
+    except (OSError, json.decoder.JSONDecodeError) as e:
+        logging.warning(f"skipping invalid manifest '{manifest_path}': {e}")
+        return None
+
+    # keep in sync with Package._set_data_from_manifest_path
+    return make_entry(app=manifest_path.parent.parent.name,
+                      package_name=manifest_path.parent.name,
+                      version=manifest_path.stem,
+                      manifest_path=manifest_path.relative_to(source_dir).as_posix(),
+                      data=data)
+
+
+def make_entry(app: str, package_name: str, version: str, manifest_path: str, data: dict) -> dict:
+    """create an index entry, manifest_path is relative to the source dir"""
+    entry = {"app": app, "package_name": package_name, "version": version, "manifest_path": manifest_path}
+    for field in INDEXED_FIELDS:
+        entry[field] = data.get(field)
+    return entry
+
+
+def build_index(source_dir: Path, manifest_paths: "list[Path]", revision: str = None) -> "list[dict]":
+    """parse all manifests once, and save the index for this source to disk"""
+    source_dir = Path(source_dir)
+    revision = revision or source_revision(source_dir)
+    entries = [_entry_from_manifest(source_dir, Path(p)) for p in manifest_paths]
+    entries = [entry for entry in entries if entry]
+    postings = save_index(source_dir, entries, revision)
+    entries = _resolve_entries(source_dir, entries)
+    _loaded_indexes[str(source_dir)] = (revision, entries, (postings, sorted(postings)))
+    return entries
+
+
+def save_index(source_dir: Path, entries: "list[dict]", revision: str) -> "dict[str, dict[str, int]]":
+    """
+    save index entries to disk, manifest paths are relative to the source dir
+    returns the search postings, saved with the index, see _build_postings
+    """
+    index_path = _index_path(source_dir)
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    postings = _build_postings(entries)
+    data = {"index_version": INDEX_VERSION, "revision": revision, "source_dir": str(source_dir), "entries": entries,
+            "postings": postings}
+
+    # write to a temp file first, so a parallel search never reads a half written index
+    temp_path = index_path.with_suffix(".tmp")
+    with open(temp_path, "w") as f:
+        json.dump(data, f)
+    temp_path.replace(index_path)
+    _loaded_indexes.pop(str(source_dir), None)
+    logging.debug(f"saved manifest index with {len(entries)} entries: '{index_path}'")
+    return postings
+
+
+def _resolve_entries(source_dir: Path, entries: "list[dict]") -> "list[dict]":
+    """return a copy of the entries, with an absolute manifest_path, and the source_dir they belong to"""
+    return [dict(entry, manifest_path=source_dir / entry["manifest_path"], source_dir=source_dir)
+            for entry in entries]
+
+
+def tokenize(text: "str|list[str]|None") -> "list[str]":
+    """split text in lowercase search tokens, e.g. 'Blender-Qt wrapper' -> ['blender', 'qt', 'wrapper']"""
+    if isinstance(text, (list, tuple)):
+        text = " ".join(str(x) for x in text)
+    return re.findall(r"[a-z0-9]+", str(text or "").lower())
+
+
+def _package_key(entry: dict) -> str:
+    return f"{entry['app']}/{entry['package_name']}"
+
+
+def _build_postings(entries: "list[dict]") -> "dict[str, dict[str, int]]":
+    """
+    build an inverted index for full text search, {token: {app/package_name: weight}}
+    a package's tokens are merged over all its versions, using the highest field weight per token
+    """
+    postings = {}
+    for entry in entries:
+        key = _package_key(entry)
+        for field, weight in SEARCH_FIELDS.items():
+            for token in tokenize(entry.get(field)):
+                scores = postings.setdefault(token, {})
+                scores[key] = max(scores.get(key, 0), weight)
+    return postings
+
+
+def rank(source_dir: Path, query: str) -> "dict[str, float]":
+    """
+    score the packages in a source for a search query, {app/package_name: score}
+    every query token has to match a token in the package, or the start of one
+    load_index has to be called first, to load the search index
+    """
+    loaded = _loaded_indexes.get(str(source_dir))
+    if not loaded:
+        return {}
+    postings, tokens = loaded[2]
+
+    scores = None
+    for query_token in tokenize(query):
+        token_scores = dict(postings.get(query_token, {}))
+        # tokens are sorted, so all tokens starting with the query token are next to each other
+        i = bisect.bisect_right(tokens, query_token)
+        while i < len(tokens) and tokens[i].startswith(query_token):
+            token = tokens[i]
+            i += 1
+            for key, weight in postings[token].items():
+                token_scores[key] = max(token_scores.get(key, 0), weight * PREFIX_MATCH_WEIGHT)
+        if scores is None:
+            scores = token_scores
+        else:
+            scores = {key: score + token_scores[key] for key, score in scores.items() if key in token_scores}
+    return scores or {}
+
+
+def load_index(source_dir: Path, revision: str = None) -> "list[dict]|None":
+    """
+    load the index for a source, returns None if there is no index or if it's outdated
+    revision: the current source revision, calculated if not set
+    """
+    source_dir = Path(source_dir)
+    revision = revision or source_revision(source_dir)
+
+    cached = _loaded_indexes.get(str(source_dir))
+    if cached and cached[0] == revision:
+        return cached[1]
+
+    index_path = _index_path(source_dir)
+    if not index_path.exists():
+        return None
+    try:
+        with open(index_path, "r") as f:
+            data = json.load(f)
+    except (OSError, json.decoder.JSONDecodeError) as e:
+        logging.warning(f"failed to read manifest index '{index_path}': {e}")
+        return None
+
+    if data.get("index_version") != INDEX_VERSION or data.get("revision") != revision:
+        return None
+
+    entries = _resolve_entries(source_dir, data["entries"])
+    postings = data["postings"]
+    _loaded_indexes[str(source_dir)] = (revision, entries, (postings, sorted(postings)))
+    return entries
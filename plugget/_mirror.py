@@ -0,0 +1,164 @@
+"""
+Local bare mirrors of package repos, one per repo_url
+
+Every version of a package is exported from the mirror with git archive,
+so installing another version of the package only fetches the new objects, instead of cloning the repo again.
+The mirror is a partial clone (no file contents until they're needed),
+and git archive only reads the repo_paths, so plugins in a big (mono)repo only download the files they need.
+
+TEMP_PLUGGET / _mirrors / repo_name_hash.git
+"""
+
+import hashlib
+import logging
+import os
+import shutil
+import subprocess
+import tarfile
+import threading
+from pathlib import Path
+
+from plugget import settings
+from plugget._utils import is_selected_member, missing_paths, safe_extract_path
+
+
+MIRROR_DIR = settings.TEMP_PLUGGET / "_mirrors"
+
+_locks = {}  # mirror path: lock, git can't fetch to the same repo in parallel
+_locks_lock = threading.Lock()
+
+
+def mirror_dir(repo_url: str) -> Path:
+    """get the mirror folder for a repo, e.g. https://github.com/hannesdelbeke/bqt -> _mirrors/bqt_1a2b3c4d5e6f.git"""
+    name = repo_url.rstrip("/").split("/")[-1]
+    if name.endswith(".git"):
+        name = name[:-len(".git")]
+    return MIRROR_DIR / f"{name}_{hashlib.sha256(repo_url.encode()).hexdigest()[:12]}.git"
+
+
+def _lock(path: Path) -> threading.Lock:
+    with _locks_lock:
+        return _locks.setdefault(str(path), threading.Lock())
+
+
+def _git(git_dir: Path, *args, timeout=None) -> "subprocess.CompletedProcess":
+    command = ["git", "--git-dir", str(git_dir), *args]
+    logging.debug(f"command: '{command}'")
+    return subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=timeout)
+
+
+def _local_ref(ref: str) -> str:
+    """
+    the ref to save a fetched commit as, so git gc doesn't remove it
+    e.g. 'tags/v1.0' -> 'refs/tags/v1.0', '1a2b3c...' -> 'refs/plugget/1a2b3c...'
+    """
+    if ref.startswith("tags/"):
+        return f"refs/{ref}"
+    return f"refs/plugget/{ref}"
+
+
+def _has_commit(git_dir: Path, ref: str) -> bool:
+    return _git(git_dir, "rev-parse", "--verify", "--quiet", f"{_local_ref(ref)}^{{commit}}").returncode == 0
+
+
+def _init(git_dir: Path, repo_url: str) -> None:
+    if (git_dir / "HEAD").exists():
+        return
+    shutil.rmtree(git_dir, ignore_errors=True)  # e.g. a failed init
+    git_dir.parent.mkdir(parents=True, exist_ok=True)
+    temp_dir = git_dir.with_name(git_dir.name + ".tmp")
+    shutil.rmtree(temp_dir, ignore_errors=True)
+    process = _git(temp_dir, "init", "--bare", "--quiet", str(temp_dir))
+    if process.returncode != 0:
+        raise Exception(f"failed to create mirror '{git_dir}': {process.stderr.decode()}")
+    _git(temp_dir, "remote", "add", "origin", repo_url)
+    temp_dir.rename(git_dir)
+
+
+def update(repo_url: str, ref: str) -> Path:
+    """
+    make sure the mirror of a repo contains a commit, and return the mirror folder
+    ref: commit SHA or 'tags/<tag>', see Package._resolve_repo_ref
+    only fetches if the commit isn't in the mirror yet
+    """
+    git_dir = mirror_dir(repo_url)
+    with _lock(git_dir):
+        _init(git_dir, repo_url)
+        if _has_commit(git_dir, ref):
+            logging.info(f"found '{ref}' in mirror '{git_dir}'")
+            return git_dir
+
+        remote_ref = f"refs/{ref}" if ref.startswith("tags/") else ref
+        logging.info(f"fetching '{ref}' from '{repo_url}' to mirror '{git_dir}'")
+        process = _git(git_dir, "fetch", "--quiet", "--depth", "1", "--filter=blob:none", "--no-tags", "origin",
+                       f"+{remote_ref}:{_local_ref(ref)}", timeout=settings.source_timeout)
+        if process.returncode != 0:
+            raise Exception(f"failed to fetch '{ref}' from '{repo_url}': {process.stderr.decode()}")
+    return git_dir
+
+
+def _existing_paths(git_dir: Path, ref: str, paths: "list[str]") -> "list[str]":
+    """get the paths that exist in the commit, git archive fails on paths that don't exist"""
+    process = _git(git_dir, "ls-tree", "--name-only", _local_ref(ref), "--", *paths)
+    if process.returncode != 0:
+        raise Exception(f"failed to list files in '{git_dir}': {process.stderr.decode()}")
+    return process.stdout.decode().splitlines()
+
+
+def export(repo_url: str, ref: str, target_dir: Path, paths: "list[str]" = None) -> None:
+    """
+    export the content of a repo at a git reference to target_dir, without the .git folder
+    fetches the commit to the mirror first if needed
+    paths: only export these files & folders (relative to the repo root), and the root requirements.txt
+    """
+    git_dir = update(repo_url, ref)
+
+    pathspecs = []
+    if paths:
+        pathspecs = [p.replace("\\", "/").strip("/") for p in paths] + ["requirements.txt"]
+        pathspecs = _existing_paths(git_dir, ref, pathspecs)
+        missing = missing_paths(pathspecs, paths)
+        if missing:
+            raise Exception(f"repo_paths {missing} not found in '{repo_url}' @ '{ref}'")
+
+    # git fetches the missing file contents for the pathspecs in a single request
+    with _lock(git_dir):
+        count = extract_archive(git_dir, _local_ref(ref), target_dir, pathspecs, paths)
+    logging.info(f"exported {count} files from '{repo_url}' @ '{ref}' to '{target_dir}'")
+
+
+def extract_archive(git_dir: Path, ref: str, target_dir: Path, pathspecs: "list[str]" = None,
+                    paths: "list[str]" = None) -> int:
+    """
+    write the files of a commit to target_dir with git archive, without a checkout or .git folder
+    the archive is streamed, instead of writing a tar file to disk first
+    pathspecs: only archive these paths, they have to exist in the commit
+    paths: only extract these files & folders, and the root requirements.txt, see is_selected_member
+    returns the number of files
+    """
+    target_dir = Path(target_dir)
+    target_dir.mkdir(parents=True, exist_ok=True)
+    target_root = target_dir.resolve()
+    command = ["git", "--git-dir", str(git_dir), "archive", "--format=tar", ref, "--", *(pathspecs or [])]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    count = 0
+    with tarfile.open(fileobj=process.stdout, mode="r|") as tar:
+        for member in tar:
+            if not member.isfile() or not is_selected_member(member.name, paths):
+                continue  # folders are created for the files, symlinks aren't supported
+            dest_path = safe_extract_path(target_root, member.name)
+            dest_path.parent.mkdir(parents=True, exist_ok=True)
+            with tar.extractfile(member) as src, open(dest_path, "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            if member.mode & 0o111:
+                os.chmod(dest_path, 0o755)
+            count += 1
+    stderr = process.stderr.read()
+    if process.wait() != 0:
+        raise Exception(f"failed to export '{ref}' from '{git_dir}': {stderr.decode()}")
+    return count
+
+
+def clear() -> None:
+    """remove all mirrors"""
+    shutil.rmtree(MIRROR_DIR, ignore_errors=True)
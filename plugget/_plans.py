@@ -0,0 +1,106 @@
+"""
+Cached resolution plans for python requirements
+
+pip resolves the dependencies of a set of requirements once (pip install --dry-run --report),
+and the result is saved as exact pins, e.g. ['requests==2.31.0', 'urllib3==2.0.7', ...]
+Installing the same requirements again, in any app with the same python ABI,
+installs the pins with --no-deps and skips the pip resolver, which is slow for big dependency trees.
+The pins also make installs reproducible. Plans are resolved again after settings.plan_ttl
+
+PLUGGET_DIR / plans / cpython-311-win_amd64 / requirements_hash.json
+"""
+
+import hashlib
+import json
+import logging
+import shutil
+import time
+from pathlib import Path
+
+from plugget import settings
+from plugget._python import import_packaging, normalize_name
+from plugget._wheelhouse import get_tag
+
+
+PLANS_DIR = settings.PLUGGET_DIR / "plans"
+
+
+def _normalize_requirement(requirement: str) -> str:
+    """normalize a requirement, so the same requirement written differently gets the same plan"""
+    requirement = requirement.strip()
+    packaging_requirements = import_packaging()
+    if not packaging_requirements:
+        return requirement
+    try:
+        req = packaging_requirements.Requirement(requirement)
+    except packaging_requirements.InvalidRequirement:  # e.g. pip options
+        return requirement
+    req.name = normalize_name(req.name)
+    return str(req)
+
+
+def _plan_path(requirements: "list[str]", interpreter: "str|Path" = None) -> Path:
+    normalized = sorted({_normalize_requirement(x) for x in requirements if x.strip()})
+    key = hashlib.sha256("\n".join(normalized).encode()).hexdigest()[:20]
+    return PLANS_DIR / get_tag(interpreter) / f"{key}.json"
+
+
+def get(requirements: "list[str]", interpreter: "str|Path" = None) -> "list[str]|None":
+    """get the cached pins for a set of requirements, None if there's no plan or it's outdated"""
+    path = _plan_path(requirements, interpreter)
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+    except (OSError, json.decoder.JSONDecodeError):
+        return None
+    if time.time() - data.get("created", 0) > settings.plan_ttl:
+        logging.debug(f"resolution plan is outdated: '{path}'")
+        return None
+    return data["pins"]
+
+
+def _subdirectory(download_info: dict) -> str:
+    subdirectory = download_info.get("subdirectory")
+    return f"#subdirectory={subdirectory}" if subdirectory else ""
+
+
+def pins_from_report(report: dict) -> "list[str]":
+    """
+    get exact pins from a pip installation report, see https://pip.pypa.io/en/stable/reference/installation-report/
+    e.g. ['requests==2.31.0', 'my-tool @ git+https://github.com/me/my-tool@1a2b3c...']
+    """
+    pins = []
+    for item in report.get("install", []):
+        name = item["metadata"]["name"]
+        download_info = item.get("download_info", {})
+        if not item.get("is_direct"):
+            pins.append(f"{name}=={item['metadata']['version']}")
+        elif "vcs_info" in download_info:  # pin the resolved commit, not the branch
+            vcs_info = download_info["vcs_info"]
+            url = f"{vcs_info['vcs']}+{download_info['url']}@{vcs_info['commit_id']}"
+            pins.append(f"{name} @ {url}" + _subdirectory(download_info))
+        else:  # archive or local folder
+            pins.append(f"{name} @ {download_info['url']}" + _subdirectory(download_info))
+    return pins
+
+
+def add(requirements: "list[str]", pins: "list[str]", interpreter: "str|Path" = None) -> Path:
+    """save the pins for a set of requirements"""
+    path = _plan_path(requirements, interpreter)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = {"requirements": sorted(requirements), "pins": pins, "created": time.time()}
+    temp_path = path.with_suffix(".json.tmp")
+    with open(temp_path, "w") as f:
+        json.dump(data, f, indent=4)
+    temp_path.replace(path)
+    return path
+
+
+def remove(requirements: "list[str]", interpreter: "str|Path" = None) -> None:
+    """remove the plan for a set of requirements, e.g. when installing the pins failed"""
+    _plan_path(requirements, interpreter).unlink(missing_ok=True)
+
+
+def clear() -> None:
+    """remove all plans"""
+    shutil.rmtree(PLANS_DIR, ignore_errors=True)
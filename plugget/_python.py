@@ -0,0 +1,67 @@
+"""
+Helpers for python packages & interpreters, shared by the requirements actions, py_pip, the wheelhouse & plans
+
+- normalize package names (PEP 503)
+- import packaging, to parse requirements
+- run a script in another python interpreter, e.g. the python of an app, once per interpreter
+"""
+
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+
+_script_results = {}  # (interpreter, script): result
+_script_lock = threading.Lock()
+
+
+def normalize_name(name: str) -> str:
+    """normalize a package name, e.g. 'Py_Pip' -> 'py-pip', see PEP 503"""
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def import_packaging():
+    """import packaging.requirements, else use the copy vendored in pip. returns None if neither is found"""
+    try:
+        import packaging.requirements
+        return packaging.requirements
+    except ImportError:
+        pass
+    try:
+        import pip._vendor.packaging.requirements
+        return pip._vendor.packaging.requirements
+    except ImportError:
+        return None
+
+
+def is_current_interpreter(interpreter: "str|Path" = None) -> bool:
+    """True if the interpreter is the python running plugget, None is the current interpreter"""
+    if not interpreter or str(interpreter) == sys.executable:
+        return True
+    return os.path.realpath(str(interpreter)) == os.path.realpath(sys.executable)
+
+
+def run_script(interpreter: "str|Path", script: str):
+    """
+    run a python script in an interpreter, and return the json it prints on the last line
+    the result is cached, so every interpreter only starts once per script
+    raises an exception if the script fails
+    """
+    key = (str(interpreter), script)
+    with _script_lock:
+        if key in _script_results:
+            return _script_results[key]
+    # don't pass the user site of the current python, or our PYTHONPATH
+    env = {**os.environ, "PYTHONNOUSERSITE": "1"}
+    env.pop("PYTHONPATH", None)
+    process = subprocess.run([str(interpreter), "-c", script], stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env)
+    if process.returncode != 0:
+        raise Exception(f"failed to run python '{interpreter}': {process.stderr.decode()}")
+    result = json.loads(process.stdout.decode().strip().splitlines()[-1])
+    with _script_lock:
+        _script_results[key] = result
+    return result
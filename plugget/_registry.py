@@ -0,0 +1,120 @@
+"""
+Registry of installed packages, one json file per app & app hash
+
+INSTALLED_DIR / app / app_hash / _INSTALLED.json  e.g. {"bqt": ["0.1.0"]}
+
+Package.install & Package.uninstall keep it in sync with the installed manifests,
+INSTALLED_DIR / app / app_hash / package_name / version.json
+so we can list installed packages with a single file read, without the manifest repo.
+"""
+
+import json
+import logging
+import threading
+from pathlib import Path
+
+from plugget import settings
+
+
+REGISTRY_FILE = "_INSTALLED.json"
+
+_cache = {}  # registry path: (mtime, data)
+_lock = threading.RLock()  # reentrant, add & remove hold it around load & _save
+
+
+def _app_dir(app: str, app_hash: str = None) -> Path:
+    from plugget.data.package import hash_current_app
+    return settings.INSTALLED_DIR / app / (app_hash or hash_current_app())
+
+
+def _scan_installed_manifests(app_dir: Path) -> "dict[str, list[str]]":
+    """build the registry from the installed manifests, for installs made before the registry existed"""
+    data = {}
+    if not app_dir.exists():
+        return data
+    for package_dir in app_dir.iterdir():
+        if package_dir.is_dir():
+            versions = sorted(p.stem for p in package_dir.glob("*.json"))
+            if versions:
+                data[package_dir.name] = versions
+    return data
+
+
+def _save(registry_path: Path, data: dict) -> None:
+    registry_path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = registry_path.with_suffix(".tmp")
+    with open(temp_path, "w") as f:
+        json.dump(data, f, indent=4)
+    temp_path.replace(registry_path)
+    _cache[str(registry_path)] = (registry_path.stat().st_mtime_ns, data)
+
+
+def load(app: str, app_hash: str = None) -> "dict[str, list[str]]":
+    """get the installed packages for an app, {package_name: [versions]}"""
+    app_dir = _app_dir(app, app_hash)
+    registry_path = app_dir / REGISTRY_FILE
+
+    with _lock:
+        try:
+            mtime = registry_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            data = _scan_installed_manifests(app_dir)
+            if data:
+                logging.info(f"created installed packages registry: '{registry_path}'")
+                _save(registry_path, data)
+            return data
+
+        cached = _cache.get(str(registry_path))
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+        try:
+            with open(registry_path, "r") as f:
+                data = json.load(f)
+        except json.decoder.JSONDecodeError:
+            logging.warning(f"invalid installed packages registry, rebuilding it: '{registry_path}'")
+            data = _scan_installed_manifests(app_dir)
+            _save(registry_path, data)
+            return data
+        _cache[str(registry_path)] = (mtime, data)
+        return data
+
+
+def installed_versions(app: str, package_name: str, app_hash: str = None) -> "list[str]":
+    """get the installed versions of a package"""
+    return load(app, app_hash).get(package_name, [])
+
+
+def installed_manifest_paths(app: str, app_hash: str = None) -> "dict[str, list[Path]]":
+    """get the installed manifest paths for an app, {package_name: [manifest paths]}"""
+    app_dir = _app_dir(app, app_hash)
+    return {package_name: [app_dir / package_name / f"{version}.json" for version in versions]
+            for package_name, versions in load(app, app_hash).items()}
+
+
+def installed_apps(app_hash: str = None) -> "list[str]":
+    """get all apps with installed packages for the current app hash"""
+    if not settings.INSTALLED_DIR.exists():
+        return []
+    return sorted(p.name for p in settings.INSTALLED_DIR.iterdir() if _app_dir(p.name, app_hash).exists())
+
+
+def add(app: str, package_name: str, version: str, app_hash: str = None) -> None:
+    """register an installed package version"""
+    # lock the whole read-modify-write, so parallel installs don't drop each other's packages
+    with _lock:
+        data = dict(load(app, app_hash))
+        versions = set(data.get(package_name, []))
+        versions.add(version)
+        data[package_name] = sorted(versions)
+        _save(_app_dir(app, app_hash) / REGISTRY_FILE, data)
+
+
+def remove(app: str, package_name: str, app_hash: str = None) -> None:
+    """unregister all installed versions of a package"""
+    with _lock:
+        data = dict(load(app, app_hash))
+        if package_name not in data:
+            return
+        del data[package_name]
+        _save(_app_dir(app, app_hash) / REGISTRY_FILE, data)
@@ -0,0 +1,220 @@
+"""
+Shared HTTP session for all plugget downloads & API requests
+
+- one pooled requests.Session, so requests to the same host reuse the connection (keep-alive)
+- retries with backoff on connection errors & 429/5xx responses
+- proxies & timeout from settings
+- conditional requests: responses with an ETag or Last-Modified header are saved to disk,
+  and the next request for the same url sends If-None-Match / If-Modified-Since.
+  a 304 Not Modified response returns the saved content, instead of downloading it again.
+
+e.g.
+from plugget import _transport
+response = _transport.get("https://api.github.com/repos/hannesdelbeke/bqt")
+"""
+
+import hashlib
+import json
+import logging
+import shutil
+import threading
+from pathlib import Path
+
+from plugget import settings
+
+
+HTTP_CACHE_DIR = settings.TEMP_PLUGGET / "_http"
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+_session = None
+_session_lock = threading.Lock()
+_cache_lock = threading.Lock()
+
+
+def get_session() -> "requests.Session":
+    """get the shared session, created on first use"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+
+            retry = Retry(total=settings.http_retries, backoff_factor=0.5, status_forcelist=RETRY_STATUS_CODES,
+                          allowed_methods=["HEAD", "GET"], raise_on_status=False)
+            adapter = HTTPAdapter(max_retries=retry, pool_maxsize=max(10, settings.source_workers * 2))
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers["User-Agent"] = "plugget"
+            _session = session
+        return _session
+
+
+def reset_session() -> None:
+    """close the shared session, e.g. after changing the proxy settings"""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+
+
+def request(method: str, url: str, **kwargs) -> "requests.Response":
+    """send a request with the shared session, using the timeout & proxies from settings"""
+    kwargs.setdefault("timeout", settings.http_timeout)
+    if settings.http_proxies:
+        kwargs.setdefault("proxies", settings.http_proxies)
+    return get_session().request(method, url, **kwargs)
+
+
+def _cache_paths(url: str, headers: dict) -> "tuple[Path, Path]":
+    """cache paths for a url, authorized requests are cached separately per token"""
+    key = hashlib.sha256(f"{url}|{headers.get('Authorization', '')}".encode()).hexdigest()[:32]
+    return HTTP_CACHE_DIR / f"{key}.json", HTTP_CACHE_DIR / f"{key}.body"
+
+
+def _load_cached(meta_path: Path, body_path: Path) -> "tuple[dict, bytes]|None":
+    try:
+        with open(meta_path, "r") as f:
+            meta = json.load(f)
+        return meta, body_path.read_bytes()
+    except (OSError, json.decoder.JSONDecodeError):
+        return None
+
+
+def _save_cached(meta_path: Path, body_path: Path, response: "requests.Response") -> None:
+    meta = {"url": response.url,
+            "etag": response.headers.get("ETag"),
+            "last-modified": response.headers.get("Last-Modified"),
+            "headers": dict(response.headers),
+            "encoding": response.encoding}
+    with _cache_lock:
+        HTTP_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        # write to temp files first, so a parallel request never reads half a response
+        body_path.with_suffix(".body.tmp").write_bytes(response.content)
+        body_path.with_suffix(".body.tmp").replace(body_path)
+        meta_path.with_suffix(".json.tmp").write_text(json.dumps(meta))
+        meta_path.with_suffix(".json.tmp").replace(meta_path)
+
+
+def _response_from_cache(url: str, meta: dict, body: bytes) -> "requests.Response":
+    import requests
+    from requests.structures import CaseInsensitiveDict
+
+    response = requests.Response()
+    response.status_code = 200
+    response.url = meta.get("url") or url
+    response.headers = CaseInsensitiveDict(meta.get("headers", {}))
+    response.encoding = meta.get("encoding")
+    response._content = body
+    response.from_cache = True
+    return response
+
+
+def get(url: str, headers: dict = None, use_cache: bool = True, **kwargs) -> "requests.Response":
+    """
+    GET a url with the shared session
+    use_cache: send a conditional request if we downloaded this url before,
+        and return the saved content if the server replies 304 Not Modified.
+        ignored for streamed requests, e.g. big downloads.
+    response.from_cache is True if the content came from the cache
+    """
+    headers = dict(headers or {})
+    if not use_cache or kwargs.get("stream"):
+        response = request("GET", url, headers=headers, **kwargs)
+        response.from_cache = False
+        return response
+
+    meta_path, body_path = _cache_paths(url, headers)
+    cached = _load_cached(meta_path, body_path)
+    if cached:
+        meta = cached[0]
+        if meta.get("etag"):
+            headers.setdefault("If-None-Match", meta["etag"])
+        if meta.get("last-modified"):
+            headers.setdefault("If-Modified-Since", meta["last-modified"])
+
+    response = request("GET", url, headers=headers, **kwargs)
+    if response.status_code == 304 and cached:
+        logging.debug(f"not modified, using cached response: '{url}'")
+        return _response_from_cache(url, *cached)
+
+    response.from_cache = False
+    if response.status_code == 200 and (response.headers.get("ETag") or response.headers.get("Last-Modified")):
+        try:
+            _save_cached(meta_path, body_path, response)
+        except OSError as e:
+            logging.warning(f"failed to cache response for '{url}': {e}")
+    return response
+
+
+def _file_sha256(path: Path, chunk_size: int = 1024 * 1024) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def download(url: str, path: Path, sha256: str = None, chunk_size: int = 1024 * 1024, **kwargs) -> Path:
+    """
+    download a url to a file, streamed in chunks
+    the download is written to path.part first, if it's interrupted the next call resumes it with a Range request.
+    sha256: optional checksum, the file is removed and an error raised if it doesn't match
+    """
+    import requests
+
+    path = Path(path)
+    part_path = path.with_name(path.name + ".part")
+    meta_path = path.with_name(path.name + ".part.json")  # etag of the partial download
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    base_headers = kwargs.pop("headers", None) or {}
+    attempts = settings.http_retries + 1
+    for attempt in range(attempts):
+        headers = dict(base_headers)
+        offset = part_path.stat().st_size if part_path.exists() else 0
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+            # only resume if the file didn't change on the server, else the server sends the full file
+            etag = json.loads(meta_path.read_text()).get("etag") if meta_path.exists() else None
+            if etag:
+                headers["If-Range"] = etag
+
+        try:
+            with request("GET", url, headers=headers, stream=True, **kwargs) as response:
+                if response.status_code == 416:  # range not satisfiable, the partial file is complete
+                    break
+                if response.status_code not in (200, 206):
+                    raise Exception(f"Failed to download {url}: {response.status_code}")
+                if response.status_code == 200 and offset:
+                    logging.info(f"server doesn't support resuming, restarting download of '{url}'")
+                if response.status_code == 206:
+                    logging.info(f"resuming download of '{url}' at {offset / 1024 ** 2:.1f} MB")
+                meta_path.write_text(json.dumps({"url": url, "etag": response.headers.get("ETag")}))
+                with open(part_path, "ab" if response.status_code == 206 else "wb") as f:
+                    for chunk in response.iter_content(chunk_size=chunk_size):
+                        f.write(chunk)
+            break
+        except (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError,
+                requests.exceptions.Timeout) as e:
+            if attempt == attempts - 1:
+                raise
+            logging.warning(f"download of '{url}' interrupted, resuming: {e}")
+
+    if sha256:
+        file_sha256 = _file_sha256(part_path)
+        if file_sha256.lower() != sha256.lower():
+            part_path.unlink()
+            meta_path.unlink(missing_ok=True)
+            raise Exception(f"checksum mismatch for {url}: expected sha256 '{sha256}', got '{file_sha256}'")
+
+    part_path.replace(path)
+    meta_path.unlink(missing_ok=True)
+    return path
+
+
+def clear_cache() -> None:
+    """remove all cached responses"""
+    shutil.rmtree(HTTP_CACHE_DIR, ignore_errors=True)
@@ -2,20 +2,184 @@
 util functions for Plugget
 """
 
+import contextlib
 import os
 from pathlib import Path
+import logging
+import queue
 import shutil
+import stat
+import sys
+import threading
+import time
 
 
 DEPENDENCIES = ["plugget", "py-pip", "detect-app", "requests"]
 
+_trash_queue = queue.Queue()  # (folder, quiet) in the trash folder, deleted by the trash thread
+_trash_thread = None
+_trash_lock = threading.Lock()
+_download_locks = {}  # zip url: lock, packages from the same repo & ref share the same zip file
+_download_locks_lock = threading.Lock()
+_dir_locks = {}  # folder: read write lock, see dir_lock
+_dir_locks_lock = threading.Lock()
 
-def rmdir(path):
-    # logging.debug(f"rmdir {path}")
-    # delete folder on windows
-    if os.path.exists(path):
-        # remove folder and all content
-        os.system(f"rmdir /s /q {path}")
+
+class _ReadWriteLock:
+    """
+    many readers at the same time, or a single writer
+    a waiting writer goes first, so readers can't keep it waiting. don't nest read() in the same thread
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writing = False
+        self._writers_waiting = 0
+
+    @contextlib.contextmanager
+    def read(self):
+        with self._condition:
+            while self._writing or self._writers_waiting:
+                self._condition.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                self._condition.notify_all()
+
+    @contextlib.contextmanager
+    def write(self):
+        with self._condition:
+            self._writers_waiting += 1
+            while self._writing or self._readers:
+                self._condition.wait()
+            self._writers_waiting -= 1
+            self._writing = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writing = False
+                self._condition.notify_all()
+
+
+def dir_lock(path: "Path|str") -> _ReadWriteLock:
+    """
+    get the read write lock of a folder that's replaced with swap_dir, e.g. a manifest repo
+    hold dir_lock(path).read() while reading files that belong together, e.g. the revision & the manifests
+    """
+    with _dir_locks_lock:
+        return _dir_locks.setdefault(os.path.abspath(str(path)), _ReadWriteLock())
+
+
+def _on_rm_error(func, path, exc):
+    """rmtree error handler, git makes read-only files on windows. make them writable and try again"""
+    try:
+        os.chmod(path, stat.S_IWRITE)
+        func(path)
+    except OSError as e:
+        logging.warning(f"failed to remove '{path}': {e}")
+
+
+def _rmtree(path) -> None:
+    """shutil.rmtree with _on_rm_error, onerror is deprecated since python 3.12"""
+    if sys.version_info >= (3, 12):
+        shutil.rmtree(path, onexc=_on_rm_error)
+    else:
+        shutil.rmtree(path, onerror=_on_rm_error)
+
+
+def _trash_dir() -> Path:
+    from plugget import settings
+    return settings.TEMP_PLUGGET / "_trash"
+
+
+def _empty_trash():
+    """delete the folders in the trash, runs on a background thread"""
+    while True:
+        path, quiet = _trash_queue.get()
+        try:
+            if quiet:
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                _rmtree(path)
+        except Exception as e:  # keep the thread alive, else wait_for_trash blocks forever
+            logging.warning(f"failed to delete '{path}' from the trash: {e}")
+        finally:
+            _trash_queue.task_done()
+
+
+def _start_trash_thread():
+    global _trash_thread
+    with _trash_lock:
+        if _trash_thread:
+            return
+        _trash_thread = threading.Thread(target=_empty_trash, name="plugget-trash", daemon=True)
+        _trash_thread.start()
+        # leftovers from a previous session, e.g. the app closed before the trash was emptied
+        # quiet, since another app running plugget might be deleting them too
+        trash_dir = _trash_dir()
+        if trash_dir.exists():
+            for path in trash_dir.iterdir():
+                _trash_queue.put((path, True))
+
+
+def wait_for_trash():
+    """block until all trashed folders are deleted"""
+    if _trash_thread:
+        _trash_queue.join()
+
+
+def rmdir(path, wait=False):
+    """
+    remove a folder and all its content, or a file
+    the folder is moved to a trash folder first, which is instant, then deleted on a background thread.
+    so a clone or install doesn't wait on deleting a big folder, and the path can be reused right away.
+    wait: delete the folder before returning, instead of on the background thread
+    """
+    path = Path(path)
+    if not os.path.lexists(path):
+        return
+    if path.is_symlink() or not path.is_dir():
+        try:
+            path.unlink()
+        except PermissionError:  # read-only file on windows
+            os.chmod(path, stat.S_IWRITE)
+            path.unlink()
+        return
+
+    if not wait:
+        trash_path = _trash_dir() / f"{path.name}_{os.getpid()}_{threading.get_ident()}_{time.time_ns()}"
+        _start_trash_thread()  # before moving to the trash, else it's queued twice as a leftover
+        try:
+            trash_path.parent.mkdir(parents=True, exist_ok=True)
+            path.rename(trash_path)
+        except OSError as e:
+            # e.g. the folder is on another drive than the trash, or a file is in use
+            logging.debug(f"failed to move '{path}' to the trash, deleting it now: {e}")
+        else:
+            _trash_queue.put((trash_path, False))
+            return
+
+    _rmtree(path)
+
+
+def swap_dir(new_dir: Path, target_dir: Path) -> None:
+    """
+    replace target_dir with new_dir, e.g. a refreshed manifest repo
+    readers holding dir_lock(target_dir).read() see the old or the new content, never a half updated folder
+    """
+    new_dir, target_dir = Path(new_dir), Path(target_dir)
+    old_dir = target_dir.with_name(f"{target_dir.name}_old")
+    rmdir(old_dir, wait=True)
+    with dir_lock(target_dir).write():  # waits for readers of the old content, see dir_lock
+        if target_dir.exists():
+            target_dir.rename(old_dir)
+        new_dir.rename(target_dir)
+    rmdir(old_dir)
 
 
 def install_plugget_dependencies(app=None):
@@ -87,49 +251,103 @@ def move_contents_up_one_level(src_dir):
     return parent_path
 
 
-def download_github_repo(repo_url, target_dir, branch=None):
-    import requests
-    import zipfile
-    import io
-    import tempfile
+def is_selected_member(relative_path: str, paths: "list[str]|None") -> bool:
+    """check if a file in the repo is in one of the paths, or is the requirements.txt in the root of the repo"""
+    if not paths or relative_path == "requirements.txt":
+        return True
+    for path in paths:
+        path = path.replace("\\", "/").strip("/")
+        if relative_path == path or relative_path.startswith(path + "/"):
+            return True
+    return False
+
+
+def missing_paths(relative_paths: "list[str]", paths: "list[str]|None") -> "list[str]":
+    """get the requested paths that don't match any of the files in the repo, see is_selected_member"""
+    missing = []
+    for path in paths or []:
+        normalized = path.replace("\\", "/").strip("/")
+        if not any(p == normalized or p.startswith(normalized + "/") for p in relative_paths):
+            missing.append(path)
+    return missing
+
+
+def safe_extract_path(target_root: Path, relative_path: str) -> Path:
+    """get the path to extract an archive member to, don't allow writing outside the target, e.g. ../../evil.py"""
+    dest_path = (target_root / relative_path).resolve()
+    if target_root not in dest_path.parents:
+        raise Exception(f"Unsafe path in archive '{relative_path}'")
+    return dest_path
+
 
+def _archive_url(repo_url, branch=None, ref=None) -> str:
+    """get the zip url for a github repo, ref is a commit SHA or 'tags/<tag>', see Package._resolve_repo_ref"""
+    repo_url = repo_url.rstrip("/")
+    if repo_url.endswith(".git"):
+        repo_url = repo_url[:-len(".git")]
+    if ref and ref.startswith("tags/"):
+        return f"{repo_url}/archive/refs/{ref}.zip"
+    if ref:
+        return f"{repo_url}/archive/{ref}.zip"
     branch = branch or "main"
-    # todo older repos use master, main fails here
+    # todo older repos use master, main fails here, pass a ref to avoid this
+    return f"{repo_url}/archive/refs/heads/{branch}.zip"
 
-    # download the zip file from the repository URL
-    if repo_url.endswith('/'):
-        repo_url = repo_url[:-1]
-    api_url = f"{repo_url}/archive/refs/heads/{branch}.zip"
 
-    # Send a request to the URL
-    response = requests.get(api_url)
-    if response.status_code == 200:
+def _download_lock(url: str) -> threading.Lock:
+    with _download_locks_lock:
+        return _download_locks.setdefault(url, threading.Lock())
+
+
+def download_github_repo(repo_url, target_dir, branch=None, ref=None, paths=None, sha256=None, chunk_size=1024 * 1024):
+    """
+    download a github repo as zip, and extract it to target_dir
+    the zip is streamed to disk in chunks, so big repos don't have to fit in memory,
+    and an interrupted download resumes where it stopped on the next try
+
+    branch: the branch to download, defaults to main. ignored if ref is set
+    ref: a commit SHA or 'tags/<tag>'
+    paths: only extract these files & folders (relative to the repo root), and the root requirements.txt
+    sha256: optional checksum of the zip, checked before extracting
+    """
+    import hashlib
+    import zipfile
+    from plugget import settings
+    from plugget import _transport
+
+    api_url = _archive_url(repo_url, branch=branch, ref=ref)
+    target_path = Path(target_dir)
+    target_path.mkdir(parents=True, exist_ok=True)
+    target_root = target_path.resolve()
+
+    # a fixed path per url, so a failed download can be resumed
+    zip_path = settings.TEMP_PLUGGET / "_downloads" / f"{hashlib.sha256(api_url.encode()).hexdigest()[:20]}.zip"
+    with _download_lock(api_url):  # another package might be downloading or extracting the same zip
+        _transport.download(api_url, zip_path, sha256=sha256, chunk_size=chunk_size, timeout=settings.source_timeout)
         print(f"Successfully downloaded {api_url}")
-    else:
-        raise Exception(f"Failed to download {api_url}: {response.status_code}")
-
-    # Create a temporary directory
-    with tempfile.TemporaryDirectory() as temp_dir:
-        temp_path = Path(temp_dir)
-
-        # Extract the content of the zip file to the temporary directory
-        with zipfile.ZipFile(io.BytesIO(response.content)) as zip_file:
-            zip_file.extractall(path=temp_path)
-            print(f"Repository extracted to temporary directory {temp_path}")
-
-        # Identify the extracted folder (assumes there's only one top-level folder in the zip file)
-        extracted_folder = next(temp_path.iterdir())
-
-        # since the zip contains a folder with branch name, we move everything up one level
-        # python-script-editor/unreal-plugin-python-script-editor-main -> python-script-editor
-        parent_path = move_contents_up_one_level(extracted_folder)
-
-        # Move the extracted folder to the target directory
-        target_path = Path(target_dir)
-        target_path.mkdir(parents=True, exist_ok=True)
-        # move all files in the extracted folder to the target folder
-        for item in parent_path.iterdir():
-            if item.is_dir():
-                shutil.move(str(item), str(target_path / item.name))
-            else:
-                shutil.move(str(item), str(target_path))
\ No newline at end of file
+
+        try:
+            count = 0
+            with zipfile.ZipFile(zip_path) as zip_file:
+                # the zip contains a root folder named after the repo and ref, strip it
+                # unreal-plugin-python-script-editor-main/Content/... -> Content/...
+                members = [(member, member.filename.split("/", 1)[1] if "/" in member.filename else "")
+                           for member in zip_file.infolist()]
+                missing = missing_paths([relative_path for _, relative_path in members], paths)
+                if missing:
+                    raise Exception(f"repo_paths {missing} not found in '{repo_url}'")
+                for member, relative_path in members:
+                    if not relative_path or member.is_dir():
+                        continue
+                    if not is_selected_member(relative_path.rstrip("/"), paths):
+                        continue
+
+                    dest_path = safe_extract_path(target_root, relative_path)
+                    dest_path.parent.mkdir(parents=True, exist_ok=True)
+                    with zip_file.open(member) as src, open(dest_path, "wb") as dst:
+                        shutil.copyfileobj(src, dst, chunk_size)
+                    count += 1
+        finally:
+            zip_path.unlink(missing_ok=True)
+
+    print(f"Extracted {count} files to {target_path}")
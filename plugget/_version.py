@@ -0,0 +1,121 @@
+"""
+Version ordering & ranges for package versions, e.g. 1.2.3, v2.0.0-beta.1, 1.0rc2, 1.0.post1, 1.0.dev1
+
+Versions that don't start with a number (e.g. 'main') sort before all numbered versions.
+Specifiers use the pip format, e.g. '>=1.2,<2', '~=1.4', '!=1.3.0', '==1.2'
+"""
+
+import re
+
+
+_VERSION_PATTERN = re.compile(r"^v?(\d+(?:\.\d+)*)(?:[-_.]?([0-9a-z][0-9a-z.\-_]*))?$")
+_SPECIFIER_PATTERN = re.compile(r"^(~=|==|!=|>=|<=|>|<)\s*(.+)$")
+_POST_PATTERN = re.compile(r"^(?:post|rev|r)[.\-_]?(\d*)$")
+_DEV_PATTERN = re.compile(r"[.\-_]?dev[.\-_]?(\d*)$")
+_OPERATORS = {
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    ">=": lambda a, b: a >= b,
+    "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b,
+    "<": lambda a, b: a < b,
+}
+
+
+def _split_version(version: str, strip_zeros: bool = True) -> "tuple[tuple[int], str]|None":
+    """
+    split a version in release numbers & pre-release tag, e.g. 'v1.2.0-beta.1' -> ((1, 2), 'beta.1')
+    strip_zeros: remove trailing zeros, so 1.0.0 == 1.0 == 1
+    """
+    version = str(version).strip().lower().split("+")[0]  # ignore build metadata, e.g. 1.0.0+build.5
+    match = _VERSION_PATTERN.match(version)
+    if not match:
+        return None
+    release = [int(x) for x in match.group(1).split(".")]
+    while strip_zeros and len(release) > 1 and release[-1] == 0:
+        release.pop()
+    prerelease = match.group(2) or ""
+    return tuple(release), prerelease
+
+
+def _split_suffix(suffix: str) -> "tuple[int, str, int, tuple]":
+    """
+    split the text after the release numbers in (phase, pre-release tag, post number, dev key)
+    phase: 0 dev release, 1 pre-release, 2 release, 3 post release, e.g. 1.0.dev1 < 1.0rc1 < 1.0 < 1.0.post1
+    """
+    dev_key = (1, 0)  # not a dev release, sorts after the dev releases of the same version
+    dev = _DEV_PATTERN.search(suffix)
+    if dev:
+        dev_key = (0, int(dev.group(1) or 0))
+        suffix = suffix[:dev.start()]
+    if not suffix:
+        return (0 if dev else 2), "", 0, dev_key
+    post = _POST_PATTERN.match(suffix)
+    if post:
+        return 3, "", int(post.group(1) or 0), dev_key
+    return 1, suffix, 0, dev_key
+
+
+def version_key(version: str) -> tuple:
+    """sort key for a version string, higher is newer"""
+    split = _split_version(version)
+    if not split:
+        return 0, str(version)
+    release, suffix = split
+    phase, prerelease, post, dev_key = _split_suffix(suffix)
+    # numbers sort before text, e.g. 1.0-1 < 1.0-alpha, like semver pre-release identifiers
+    tag = tuple((0, int(x), "") if x.isdigit() else (1, 0, x) for x in re.findall(r"\d+|[a-z]+", prerelease))
+    return 1, release, phase, tag, post, dev_key
+
+
+def is_prerelease(version: str) -> bool:
+    """True for versions with a pre-release tag or dev releases, e.g. 1.0.0-beta or 1.0.dev1, not post releases"""
+    split = _split_version(version)
+    if not split:
+        return False
+    phase, _, _, dev_key = _split_suffix(split[1])
+    return phase < 2 or dev_key[0] == 0
+
+
+def is_specifier(text: str) -> bool:
+    """True if the text is a version range, e.g. '>=1.2,<2', instead of a version"""
+    return all(_SPECIFIER_PATTERN.match(part.strip()) for part in str(text).split(","))
+
+
+def _parse_specifier(specifier: str) -> "list[tuple[str, tuple]]":
+    """parse a specifier to a list of (operator, version key)"""
+    clauses = []
+    for part in specifier.split(","):
+        operator, version = _SPECIFIER_PATTERN.match(part.strip()).groups()
+        if operator == "~=":
+            # compatible release, ~=1.4.2 -> >=1.4.2,<1.5 and ~=v1.4rc1 -> >=1.4rc1,<2
+            split = _split_version(version, strip_zeros=False)
+            if not split:
+                raise ValueError(f"'~=' needs a numbered version, got '{version}'")
+            release = list(split[0])
+            if len(release) < 2:
+                raise ValueError(f"'~=' needs at least 2 version numbers, got '{version}'")
+            upper = release[:-1]
+            upper[-1] += 1
+            clauses.append((">=", version_key(version)))
+            # below every version of the upper release, so it excludes 1.5 pre-releases & dev releases
+            clauses.append(("<", (1, _split_version(".".join(str(x) for x in upper))[0], -1)))
+        else:
+            clauses.append((operator, version_key(version)))
+    return clauses
+
+
+def sort_versions(versions: "list[str]") -> "list[str]":
+    """sort versions, newest first"""
+    return sorted(versions, key=version_key, reverse=True)
+
+
+def filter_versions(versions: "list[str]", specifier: str) -> "list[str]":
+    """
+    return the versions matching the specifier, in the same order
+    pre-releases only match if no release matches, e.g. '>=2' matches 2.0.0-beta if there's no 2.x release
+    """
+    clauses = _parse_specifier(specifier)
+    matches = [v for v in versions if all(_OPERATORS[op](version_key(v), key) for op, key in clauses)]
+    releases = [v for v in matches if not is_prerelease(v)]
+    return releases or matches
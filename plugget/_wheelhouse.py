@@ -0,0 +1,125 @@
+"""
+Local wheelhouse, shared by all apps that install python requirements
+
+pip builds or downloads the wheels for a requirement once, per python ABI,
+and every app with the same python installs them from the wheelhouse with --no-index --find-links.
+e.g. blender & substance painter on python 3.11 share the wheels, instead of both downloading numpy.
+The wheels stay after an install, so requirements can be reinstalled offline.
+The least recently used wheels are removed when the wheelhouse grows bigger than settings.cache_max_size
+
+PLUGGET_DIR / wheelhouse / cpython-311-win_amd64
+"""
+
+import logging
+import os
+import shutil
+import sys
+import sysconfig
+import threading
+import time
+from pathlib import Path
+
+from plugget import settings
+from plugget._python import normalize_name, is_current_interpreter, run_script
+
+
+WHEELHOUSE_DIR = settings.PLUGGET_DIR / "wheelhouse"
+
+# prints the ABI tag of an interpreter as json, e.g. "cpython-311-win_amd64"
+_TAG_SCRIPT = "import json, sys, sysconfig; " \
+              "print(json.dumps(sys.implementation.cache_tag + getattr(sys, 'abiflags', '') + '-' + " \
+              "sysconfig.get_platform().replace('-', '_').replace('.', '_')))"
+
+_locks = {}  # wheel dir: lock, so 2 installs don't write the same wheels in parallel
+_locks_lock = threading.Lock()
+
+
+def _current_tag() -> str:
+    platform = sysconfig.get_platform().replace("-", "_").replace(".", "_")
+    return f"{sys.implementation.cache_tag}{getattr(sys, 'abiflags', '')}-{platform}"
+
+
+def get_tag(interpreter: "str|Path" = None) -> str:
+    """
+    get the ABI tag of a python interpreter, e.g. 'cpython-311-win_amd64'
+    wheels built for one tag can be installed by any interpreter with the same tag
+    """
+    if is_current_interpreter(interpreter):
+        return _current_tag()
+    return run_script(interpreter, _TAG_SCRIPT)
+
+
+def wheel_dir(interpreter: "str|Path" = None) -> Path:
+    """get the wheelhouse folder for an interpreter, and create it if needed"""
+    path = WHEELHOUSE_DIR / get_tag(interpreter)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def lock(path: Path) -> threading.Lock:
+    """get the lock for a wheel folder, hold it while filling it"""
+    with _locks_lock:
+        return _locks.setdefault(str(path), threading.Lock())
+
+
+def wheels(interpreter: "str|Path" = None) -> "list[Path]":
+    """get the wheels in the wheelhouse of an interpreter"""
+    path = WHEELHOUSE_DIR / get_tag(interpreter)
+    return sorted(path.glob("*.whl")) if path.exists() else []
+
+
+def _wheel_key(name: str, version: str) -> "tuple[str, str]":
+    return normalize_name(name), version
+
+
+def mark_used(installed: "list[str]", interpreter: "str|Path" = None) -> "list[Path]":
+    """
+    update the modified time of the wheels that were installed, so prune removes them last
+    installed: distributions as printed by pip, e.g. ['requests-2.31.0', 'urllib3-2.0.7']
+    """
+    keys = {_wheel_key(*x.rsplit("-", 1)) for x in installed if "-" in x}
+    used = [p for p in wheels(interpreter) if _wheel_key(*p.name.split("-")[:2]) in keys]
+    now = time.time()
+    for path in used:
+        try:
+            os.utime(path, (now, now))
+        except OSError as e:
+            logging.debug(f"failed to update wheel time '{path}': {e}")
+    return used
+
+
+def prune(max_size: int = None) -> "list[Path]":
+    """
+    remove the least recently used wheels, for all interpreters, until the wheelhouse is smaller than max_size
+    max_size: in bytes, defaults to settings.cache_max_size
+    returns the removed wheels
+    """
+    max_size = settings.cache_max_size if max_size is None else max_size
+    if not WHEELHOUSE_DIR.exists():
+        return []
+    items = []
+    for path in WHEELHOUSE_DIR.glob("*/*.whl"):
+        try:
+            stat = path.stat()
+        except OSError:  # removed in parallel
+            continue
+        items.append((stat.st_mtime, stat.st_size, path))
+    items.sort()  # oldest first
+    total = sum(size for _, size, _ in items)
+
+    removed = []
+    for _, size, path in items:
+        if total <= max_size:
+            break
+        with lock(path.parent):
+            logging.info(f"removing wheel '{path.name}'")
+            path.unlink(missing_ok=True)
+        total -= size
+        removed.append(path)
+    return removed
+
+
+def clear() -> None:
+    """remove all wheels"""
+    logging.info(f"removing wheelhouse '{WHEELHOUSE_DIR}'")
+    shutil.rmtree(WHEELHOUSE_DIR, ignore_errors=True)
@@ -31,19 +31,12 @@ class CopyFiles:
             print("copying", sub_path, "to", cls.target_dir)
 
             target_path = cls.target_dir / sub_path.name  # can be folder or file
-            if target_path.exists():
+            if target_path.exists() and not package.owns_path(target_path):
                 logging.warning(f"file already exists, overwriting: '{target_path}'")
-                if target_path.is_dir():
-                    shutil.rmtree(target_path)
-                else:  # file
-                    target_path.unlink()
-
-            # check file or folder
-            if sub_path.is_dir():
-                # todo this is a naive implementation, doesn't handle nested folders
-                new_path = shutil.copytree(sub_path, cls.target_dir / sub_path.name)
-            else:
-                new_path = shutil.copy(sub_path, cls.target_dir)
+
+            # reflink or copy the file or folder, see plugget._deploy
+            # when upgrading, only changed files are replaced
+            new_path = package.deploy(sub_path, target_path)
 
             # confirm files were copied
             if not Path(new_path).exists():
@@ -10,10 +10,17 @@ except ImportError:
     # we can then use plugget to update it's own dependencies
     from plugget.vendor import py_pip
 
+import contextlib
 import os
+import re
+import json
 import logging
+import tempfile
+import importlib.metadata
 from pathlib import Path
 import plugget.actions._utils
+from plugget import settings, _wheelhouse, _plans
+from plugget._python import normalize_name, import_packaging, is_current_interpreter, run_script
 
 
 def get_requirements_txt_paths(package: "plugget.data.Package", **kwargs) -> "list[Path]":
@@ -46,6 +53,149 @@ def iter_requirements_paths(package: "plugget.data.Package") -> "Generator[Path]
         print(f"no requirements.txt paths found in '{package.clone_dir}'")
 
 
+def get_requirements(package: "plugget.data.Package") -> "list[str]":
+    """get the requirement lines from all requirements.txt files of a package"""
+    requirements = []
+    for req_path in iter_requirements_paths(package):
+        requirements.extend(py_pip.iter_packages_in_requirements(req_path))
+    return requirements
+
+
+def get_dependency_packages(package: "plugget.data.Package") -> "list[plugget.data.Package]":
+    """
+    get the dependencies (and their dependencies) installed together with the package, for the same app
+    only dependencies with downloaded content, see plugget.data.package.install_packages
+    dependencies for other apps install their requirements to their own app
+    """
+    dependencies = []
+    todo = list(package._dependency_packages)
+    while todo:
+        dependency = todo.pop(0)
+        if dependency in dependencies or dependency is package or dependency.app != package.app:
+            continue
+        if not dependency.repo_url or not dependency.clone_dir.exists():
+            continue  # not downloaded, its own action handles its requirements
+        dependencies.append(dependency)
+        todo.extend(dependency._dependency_packages)
+    return dependencies
+
+
+def get_installed_distributions(path: "str|Path") -> "dict[str, importlib.metadata.Distribution]":
+    """get the distributions installed in a folder, {normalized name: distribution}"""
+    installed = {}
+    for dist in importlib.metadata.distributions(path=[str(path)]):
+        name = dist.metadata["Name"]
+        if name:
+            installed.setdefault(normalize_name(name), dist)
+    return installed
+
+
+# prints the environment markers of an interpreter as json, like packaging.markers.default_environment
+_MARKER_ENVIRONMENT_SCRIPT = """
+import json, os, platform, sys
+info = sys.implementation.version
+version = "{0.major}.{0.minor}.{0.micro}".format(info)
+if info.releaselevel != "final":
+    version += info.releaselevel[0] + str(info.serial)
+print(json.dumps({
+    "implementation_name": sys.implementation.name,
+    "implementation_version": version,
+    "os_name": os.name,
+    "platform_machine": platform.machine(),
+    "platform_release": platform.release(),
+    "platform_system": platform.system(),
+    "platform_version": platform.version(),
+    "python_full_version": platform.python_version(),
+    "platform_python_implementation": platform.python_implementation(),
+    "python_version": ".".join(platform.python_version_tuple()[:2]),
+    "sys_platform": sys.platform,
+}))
+"""
+
+
+def get_marker_environment(interpreter: "str|Path" = None) -> "dict|None":
+    """
+    get the environment markers of a python interpreter, e.g. {'python_version': '3.10', 'sys_platform': 'win32'}
+    to evaluate requirement markers for the app's python, e.g. when plugget runs outside the app.
+    runs the interpreter once, and caches the result. returns None if we can't run it.
+    returns {} for the current interpreter, packaging uses its own environment for missing keys
+    """
+    if is_current_interpreter(interpreter):
+        return {}
+    try:
+        return run_script(interpreter, _MARKER_ENVIRONMENT_SCRIPT)
+    except Exception as e:
+        logging.warning(f"failed to get environment markers of interpreter '{interpreter}': {e}")
+        return None
+
+
+def is_requirement_satisfied(requirement: str, installed: dict, _checked: set = None, environment: dict = None) -> bool:
+    """
+    check in-process if a requirement is installed, without starting pip
+    requirement: a requirements.txt line, e.g. 'requests>=2.0; python_version>"3.7"'
+    installed: see get_installed_distributions
+    environment: environment markers of the interpreter that uses the requirements, see get_marker_environment
+    also checks the dependencies of the installed distribution, in case one is missing.
+    returns False if we can't tell, e.g. pip options or urls, so pip handles them
+    """
+    packaging_requirements = import_packaging()
+    if not packaging_requirements or requirement.startswith("-"):
+        return False
+    try:
+        req = packaging_requirements.Requirement(requirement)
+    except packaging_requirements.InvalidRequirement:
+        return False
+    if req.url:
+        return False
+    environment = environment or {}
+    if req.marker and not req.marker.evaluate({**environment, "extra": ""}):
+        return True  # not needed on this platform
+
+    name = normalize_name(req.name)
+    dist = installed.get(name)
+    if dist is None or not req.specifier.contains(dist.version, prereleases=True):
+        return False
+
+    _checked = set() if _checked is None else _checked
+    extras = sorted(req.extras)
+    key = (name, tuple(extras))
+    if key in _checked:  # circular dependencies
+        return True
+    _checked.add(key)
+
+    for dependency in dist.requires or []:
+        try:
+            dependency_req = packaging_requirements.Requirement(dependency)
+        except packaging_requirements.InvalidRequirement:
+            return False
+        if dependency_req.marker:
+            # dependencies of an extra have a marker like 'extra == "socks"'
+            if not any(dependency_req.marker.evaluate({**environment, "extra": extra}) for extra in [""] + extras):
+                continue
+            dependency_req.marker = None
+        if not is_requirement_satisfied(str(dependency_req), installed, _checked, environment):
+            return False
+    return True
+
+
+def get_unsatisfied_requirements(requirements: "list[str]", target: "str|Path",
+                                 interpreter: "str|Path" = None) -> "list[str]":
+    """
+    get the requirements that aren't installed in the target folder yet
+    interpreter: the python that uses the target, to evaluate markers. defaults to the current interpreter
+    """
+    if not target or not Path(target).exists():
+        return list(requirements)
+    if not import_packaging():
+        logging.debug("packaging not found, can't check installed requirements")
+        return list(requirements)
+    environment = get_marker_environment(interpreter)
+    if environment is None:  # let pip check them
+        return list(requirements)
+    installed = get_installed_distributions(target)
+    return [x for x in requirements if not is_requirement_satisfied(x, installed, environment=environment)]
+
+
 # plugget gets requirements from requirements.txt, because the module is not packaged.
 # if we can get requirements from setup.py or pyproject.toml, the module is packaged,
 # and we don't need plugget. Keeping these methods for now, in case we need them later.
@@ -77,6 +227,15 @@ def iter_requirements_paths(package: "plugget.data.Package") -> "Generator[Path]
 #     return requirements
 
 
+@contextlib.contextmanager
+def _requirements_file(requirements: "list[str]") -> "Generator[Path]":
+    """write the requirements to a temp requirements.txt, removed after use"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        requirements_path = Path(temp_dir) / "requirements.txt"
+        requirements_path.write_text("\n".join(requirements) + "\n")
+        yield requirements_path
+
+
 class RequirementsAction:
     """
     interpreter: Path to interpreter to use for pip commands
@@ -101,18 +260,178 @@ class RequirementsAction:
         print("install requirements to target", cls.target)
         cls.setup_py_pip()
 
-        requirements = requirements or []
+        requirements = list(requirements or [])
 
+        dependencies = []
         if package:
+            if package._requirements_installed:
+                print(f"requirements of '{package.package_name}' were installed with a dependent package")
+                return
             package.get_content(use_cached=True)
-            for req_path in iter_requirements_paths(package):
-                print("requirements.txt found: ", req_path)
-                for package_name in py_pip.iter_packages_in_requirements(req_path):
-                    requirements.append(package_name)
+            requirements.extend(get_requirements(package))
+            # install the requirements of dependencies in the same pip run
+            dependencies = get_dependency_packages(package)
+            for dependency in dependencies:
+                requirements.extend(get_requirements(dependency))
 
         if not (requirements or package):
             logging.warning("no package provided to RequirementsAction.install method")
 
+        cls._install_requirements(requirements, force=force)
+        # the requirements of the dependencies are installed, so their own action skips pip
+        for dependency in dependencies:
+            dependency._requirements_installed = True
+
+    @classmethod
+    def _install_requirements(cls, requirements: "list[str]", force=False):
+        # skip empty lines & duplicates, e.g. a requirement shared by the package and a dependency
+        requirements = [x.strip() for x in requirements if x.strip()]
+        requirements = list(dict.fromkeys(requirements))
+        if not requirements:
+            return
+
+        # skip requirements that are already installed in the target, starting pip is slow inside an app
+        unsatisfied = requirements
+        if not force:
+            unsatisfied = get_unsatisfied_requirements(requirements, cls.target, cls.interpreter)
+            for requirement in requirements:
+                if requirement not in unsatisfied:
+                    print(f"requirement already satisfied: '{requirement}'")
+            if not unsatisfied:
+                return
+
+        # a single pip run resolves all requirements together, instead of starting pip for every requirement
+        try:
+            cls._install_requirements_batch(requirements, unsatisfied, force=force)
+        except Exception as e:
+            # install one by one, to find which requirement failed,
+            # and to pass requirements that are already installed but in use
+            logging.warning(f"failed to install requirements in a single pip run, installing them one by one: {e}")
+            cls._install_requirements_one_by_one(unsatisfied, force=force)
+
+    @classmethod
+    def _install_requirements_batch(cls, requirements: "list[str]", unsatisfied: "list[str]", force=False):
+        """
+        requirements: all requirements, the resolution plan is for the full set, so it's the same on every install
+        unsatisfied: the requirements that aren't installed yet
+        """
+        print(f"installing requirements: {', '.join(unsatisfied)}")
+        pins = cls._get_resolution_plan(requirements, force=force) if settings.use_resolution_plans else None
+        if pins and not force:
+            pins = get_unsatisfied_requirements(pins, cls.target, cls.interpreter)
+        if pins:
+            # the pins include all dependencies, so pip doesn't need to resolve them again
+            try:
+                cls._install_requirements_file(pins, force=force, no_deps=True)
+                return
+            except Exception as e:
+                logging.warning(f"failed to install from resolution plan, installing without it: {e}")
+                _plans.remove(requirements, py_pip.python_interpreter)
+        cls._install_requirements_file(unsatisfied, force=force)
+
+    @classmethod
+    def _install_requirements_file(cls, requirements: "list[str]", force=False, no_deps=False):
+        """pip install the requirements in a single run, from a temp requirements.txt"""
+        options = ["--no-deps"] if no_deps else []
+        with _requirements_file(requirements) as requirements_path:
+            if settings.use_wheelhouse:
+                stdout, error = cls._install_from_wheelhouse(requirements_path, force=force, options=options)
+            else:
+                stdout, error = cls._pip_install(requirements_path, force=force, options=options)
+        print(stdout.decode())
+
+    @classmethod
+    def _run_pip(cls, *args: str) -> "tuple[int, bytes, bytes]":
+        """run a pip command with the interpreter of the app, returns (return code, stdout, stderr)"""
+        process = py_pip.run_command_process([str(py_pip.python_interpreter), "-m", "pip", *args])
+        stdout, error = process.communicate()
+        return process.returncode, stdout, error
+
+    @classmethod
+    def _pip_install(cls, requirements_path: Path, force=False, options: "list[str]" = None, check=True):
+        """
+        pip install a requirements.txt to the target, used for every batch install
+        check: raise an exception if pip fails, else return None
+        returns (stdout, stderr)
+        """
+        args = ["install", "-r", str(requirements_path), "--upgrade"]
+        if force:
+            args.append("--force-reinstall")
+        if cls.target:
+            args.extend(["--target", str(cls.target), "--no-user"])
+        returncode, stdout, error = cls._run_pip(*args, *(options or []))
+        if returncode != 0:
+            if check:
+                raise RuntimeError(f"pip install failed with return code {returncode}: {error.decode()}")
+            return None
+        importlib.invalidate_caches()
+        if settings.use_wheelhouse:  # so prune removes them last
+            installed = re.search(r"^Successfully installed (.+)$", stdout.decode(), re.MULTILINE)
+            if installed:
+                _wheelhouse.mark_used(installed.group(1).split(), py_pip.python_interpreter)
+        return stdout, error
+
+    @classmethod
+    def _get_resolution_plan(cls, requirements: "list[str]", force=False) -> "list[str]|None":
+        """
+        get exact pins for the requirements & all their dependencies, see plugget._plans
+        resolves the requirements with pip install --dry-run if there's no cached plan, or if force is True
+        returns None if pip can't resolve them, e.g. pip is older than 22.2
+        """
+        interpreter = py_pip.python_interpreter
+        pins = None if force else _plans.get(requirements, interpreter)
+        if pins:
+            print(f"using cached resolution plan: {', '.join(pins)}")
+            return pins
+
+        with _requirements_file(requirements) as requirements_path:
+            report_path = requirements_path.parent / "report.json"
+            args = ["install", "--dry-run", "--ignore-installed", "--quiet", "--report", str(report_path),
+                    "-r", str(requirements_path)]
+            if settings.use_wheelhouse:
+                args.extend(["--find-links", str(_wheelhouse.wheel_dir(interpreter))])
+            returncode, stdout, error = cls._run_pip(*args)
+            if returncode != 0 or not report_path.exists():
+                logging.warning(f"failed to resolve requirements, installing without a resolution plan: "
+                                f"{error.decode()}")
+                return None
+            with open(report_path, "r") as f:
+                report = json.load(f)
+
+        pins = _plans.pins_from_report(report)
+        _plans.add(requirements, pins, interpreter)
+        print(f"resolved requirements: {', '.join(pins)}")
+        return pins
+
+    @classmethod
+    def _install_from_wheelhouse(cls, requirements_path: Path, force=False, options: "list[str]" = None):
+        """
+        install the requirements from the shared wheelhouse without an index, see plugget._wheelhouse
+        if wheels are missing, pip wheel them to the wheelhouse first, then install from there.
+        wheels in the wheelhouse aren't downloaded or built again, by any app with the same python ABI.
+        if pip wheel fails, e.g. when offline, try to install from the wheels we already have
+        """
+        interpreter = py_pip.python_interpreter
+        wheel_dir = _wheelhouse.wheel_dir(interpreter)
+        options = ["--no-index", "--find-links", str(wheel_dir)] + (options or [])
+        with _wheelhouse.lock(wheel_dir):
+            result = None
+            if _wheelhouse.wheels(interpreter):
+                result = cls._pip_install(requirements_path, force=force, options=options, check=False)
+            if not result:
+                logging.info(f"adding requirements to wheelhouse '{wheel_dir}'")
+                wheel_options = ["--no-deps"] if "--no-deps" in options else []
+                returncode, stdout, error = cls._run_pip("wheel", "-r", str(requirements_path), "--wheel-dir",
+                                                         str(wheel_dir), "--find-links", str(wheel_dir), *wheel_options)
+                if returncode != 0:
+                    logging.warning(f"failed to add requirements to wheelhouse '{wheel_dir}', "
+                                    f"installing from the wheels in it: {error.decode()}")
+                result = cls._pip_install(requirements_path, force=force, options=options)
+        _wheelhouse.prune()
+        return result
+
+    @classmethod
+    def _install_requirements_one_by_one(cls, requirements: "list[str]", force=False):
         for package_name in requirements:
             try:
                 print(f"installing '{package_name}' from requirements.txt")
@@ -76,9 +76,10 @@ def _install_addon(package, force=False, target=None):
     for addon_path in addon_paths:
         print(addon_path)
 
+        upgrade = package.owns_path(local_addons_dir / addon_path.name)  # installed by the previous version
         if force:
             rmdir(local_addons_dir / addon_path.name)
-        elif clash_import_name(addon_path.name):
+        elif clash_import_name(addon_path.name) and not upgrade:
             logging.warning(f"skipping addon install '{addon_path.name}', clashing py-module already imported")
             continue
 
@@ -86,12 +87,13 @@ def _install_addon(package, force=False, target=None):
         local_addons_dir.mkdir(parents=True, exist_ok=True)
 
         # check if folder exists already, e.g. if addon is disabled import check will let it pass
-        if not force and (local_addons_dir / addon_path.name).exists():
+        if not force and not upgrade and (local_addons_dir / addon_path.name).exists():
             logging.warning(f"Addon '{addon_path.name}' already installed")
             continue
             
-        # todo replace move with copytree, else we mess with the package's content cache
-        shutil.move(str(addon_path), str(local_addons_dir))
+        # deploy instead of move, so the package's content cache stays intact
+        # when upgrading, only changed files are replaced
+        package.deploy(addon_path, local_addons_dir / addon_path.name)
 
         # todo clean up empty folders
 
@@ -51,12 +51,13 @@ def install(package: "plugget.data.Package", force=False, enable=True, **kwargs)
     for addon_path in addon_paths:
         print(addon_path)
 
-        if clash_import_name(addon_path.name):
+        upgrade = package.owns_path(local_addons_dir / addon_path.name)  # installed by the previous version
+        if clash_import_name(addon_path.name) and not upgrade:
             continue
 
-        # new_addon_path.mkdir(parents=True, exist_ok=True)
-        shutil.move(str(addon_path), str(local_addons_dir))
-        # todo use copy instead of move
+        # deploy instead of move, so the package's content cache stays intact
+        # when upgrading, only changed files are replaced
+        package.deploy(addon_path, local_addons_dir / addon_path.name)
 
         # todo clean up empty folders
 
@@ -0,0 +1,203 @@
+"""
+Content cache for package downloads, shared by all apps and versions
+
+Downloads are saved per repo URL and resolved git reference (commit SHA or tag),
+so installing the same content in Blender, Maya, ... or reinstalling it, won't download it again.
+The least recently used entries are removed when the cache grows bigger than settings.cache_max_size
+
+e.g.
+import plugget.cache
+plugget.cache.info()  # print cached entries
+plugget.cache.prune(max_size=1024 ** 3)  # shrink the cache to 1 GB
+plugget.cache.clear()  # remove all cached content
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+
+from plugget import settings
+from plugget._utils import rmdir
+
+
+CACHE_DIR = settings.TEMP_PLUGGET / "_cache"
+ENTRY_FILE = "_ENTRY.json"  # metadata, saved last, so an entry without it is incomplete
+HASHES_FILE = "_HASHES.json"  # sha256 of the content files, saved the first time they're needed
+
+_locks = {}  # entry key: lock, to avoid downloading the same content in parallel
+_locks_lock = threading.Lock()
+
+
+def _key(repo_url: str, ref: str, paths: "list[str]" = None) -> str:
+    key = f"{repo_url}@{ref}"
+    if paths:  # partial downloads, with only some paths of the repo
+        key += ":" + ",".join(sorted(paths))
+    return hashlib.sha256(key.encode()).hexdigest()[:20]
+
+
+def _folder_size(path: Path) -> int:
+    size = 0
+    for root, dirs, files in os.walk(path):
+        for name in files:
+            try:
+                size += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return size
+
+
+def _read_entry(entry_dir: Path) -> "dict|None":
+    try:
+        with open(entry_dir / ENTRY_FILE, "r") as f:
+            data = json.load(f)
+    except (OSError, json.decoder.JSONDecodeError):
+        return None
+    data["path"] = entry_dir
+    return data
+
+
+def _write_entry(entry_dir: Path, data: dict) -> None:
+    data = {k: v for k, v in data.items() if k != "path"}
+    temp_path = entry_dir / f"{ENTRY_FILE}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump(data, f, indent=4)
+    temp_path.replace(entry_dir / ENTRY_FILE)
+
+
+def lock(repo_url: str, ref: str, paths: "list[str]" = None) -> threading.Lock:
+    """get the lock for a cache entry, hold it while checking & adding the entry"""
+    with _locks_lock:
+        return _locks.setdefault(_key(repo_url, ref, paths), threading.Lock())
+
+
+def _entry_lock(entry_dir: Path) -> threading.Lock:
+    """lock for the files of an entry, e.g. the hashes file"""
+    with _locks_lock:
+        return _locks.setdefault(str(entry_dir), threading.Lock())
+
+
+def get(repo_url: str, ref: str, paths: "list[str]" = None) -> "Path|None":
+    """
+    get the cached content folder for a repo at a git reference, None if it's not cached
+    paths: for partial content, the repo paths that were downloaded
+    """
+    entry_dir = CACHE_DIR / _key(repo_url, ref, paths)
+    data = _read_entry(entry_dir)
+    if not data or not (entry_dir / "content").exists():
+        return None
+    data["last_used"] = time.time()
+    _write_entry(entry_dir, data)
+    return entry_dir / "content"
+
+
+def add(repo_url: str, ref: str, content_dir: Path, paths: "list[str]" = None) -> Path:
+    """
+    move downloaded content into the cache, and return the cached content folder
+    content_dir should be on the same drive as the cache, e.g. a temp folder made with new_download_dir
+    """
+    entry_dir = CACHE_DIR / _key(repo_url, ref, paths)
+    if entry_dir.exists():  # e.g. an incomplete entry from a failed download
+        shutil.rmtree(entry_dir, ignore_errors=True)
+    entry_dir.mkdir(parents=True)
+    shutil.move(str(content_dir), str(entry_dir / "content"))
+
+    now = time.time()
+    data = {"repo_url": repo_url, "ref": ref, "paths": paths or None, "size": _folder_size(entry_dir / "content"),
+            "created": now, "last_used": now}
+    _write_entry(entry_dir, data)
+
+    prune(keep=[entry_dir])
+    return entry_dir / "content"
+
+
+def file_hashes(content_dir: Path, compute: bool = True) -> "dict[str, str]|None":
+    """
+    get the sha256 of the files in a cached content folder, {relative posix path: sha256}, see _deploy.hash_files
+    the hashes are saved with the cache entry, so the content is only hashed once
+    compute: hash the content if the hashes aren't saved yet, else return None
+    """
+    from plugget import _deploy
+
+    entry_dir = Path(content_dir).parent
+    hashes_path = entry_dir / HASHES_FILE
+    with _entry_lock(entry_dir):
+        try:
+            with open(hashes_path, "r") as f:
+                return json.load(f)
+        except (OSError, json.decoder.JSONDecodeError):
+            pass
+        if not compute:
+            return None
+        hashes = _deploy.hash_files(content_dir)
+        temp_path = entry_dir / f"{HASHES_FILE}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(hashes, f)
+        temp_path.replace(hashes_path)
+        return hashes
+
+
+def new_download_dir() -> Path:
+    """create an empty temp folder next to the cache, to download content to before adding it"""
+    download_dir = CACHE_DIR / "_downloads" / f"{os.getpid()}_{threading.get_ident()}_{time.time_ns()}"
+    download_dir.mkdir(parents=True)
+    return download_dir
+
+
+def entries() -> "list[dict]":
+    """get all cache entries, most recently used first"""
+    if not CACHE_DIR.exists():
+        return []
+    items = [_read_entry(p) for p in CACHE_DIR.iterdir() if p.is_dir() and not p.name.startswith("_")]
+    items = [item for item in items if item]
+    return sorted(items, key=lambda x: x.get("last_used", 0), reverse=True)
+
+
+def size() -> int:
+    """get the total size of the cached content in bytes"""
+    return sum(item.get("size", 0) for item in entries())
+
+
+def info(verbose=True) -> "list[dict]":
+    """print the cached entries, and return them"""
+    items = entries()
+    if verbose:
+        print(f"{len(items)} entries in content cache '{CACHE_DIR}', {size() / 1024 ** 2:.1f} MB")
+        for item in items:
+            last_used = time.strftime("%Y-%m-%d %H:%M", time.localtime(item.get("last_used", 0)))
+            print(f"  {item['size'] / 1024 ** 2:8.1f} MB  {last_used}  {item['repo_url']} @ {item['ref']}")
+    return items
+
+
+def prune(max_size: int = None, keep: "list[Path]" = None) -> "list[dict]":
+    """
+    remove the least recently used entries, until the cache is smaller than max_size
+    max_size: in bytes, defaults to settings.cache_max_size
+    keep: entry folders to never remove, e.g. the entry that's being installed
+    returns the removed entries
+    """
+    max_size = settings.cache_max_size if max_size is None else max_size
+    keep = keep or []
+    items = entries()
+    total = sum(item.get("size", 0) for item in items)
+
+    removed = []
+    for item in reversed(items):  # oldest first
+        if total <= max_size:
+            break
+        if item["path"] in keep:
+            continue
+        logging.info(f"removing cached content '{item['repo_url']} @ {item['ref']}'")
+        rmdir(item["path"])
+        total -= item.get("size", 0)
+        removed.append(item)
+    return removed
+
+
+def clear() -> None:
+    """remove all cached content"""
+    shutil.rmtree(CACHE_DIR, ignore_errors=True)
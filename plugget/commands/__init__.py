@@ -7,10 +7,17 @@ import subprocess
 import datetime
 import pprint
 import os
+import threading
+import concurrent.futures
 
-from plugget._utils import rmdir
+from plugget._utils import rmdir, swap_dir, dir_lock
 from plugget.data import Package, PackagesMeta
+from plugget.data.package import install_packages
 from plugget import settings
+from plugget import _index
+from plugget import _catalog
+from plugget import _mirror
+from plugget import _registry
 
 from pathlib import Path
 
@@ -20,9 +27,11 @@ __all__ = [
     "search",
     "list",
     "install",
+    "install_config",
     "uninstall",
     "info",
     "open_installed_dir",
+    "build_catalog",
     "help",
 ]
 
@@ -43,35 +52,23 @@ __all__ = [
 #         return plugin_name
 
 
-def _clone_manifest_repo(source_url, use_cache=False) -> "pathlib.Path":
-    """Clone git repo containing plugget manifests, from a git URL"""
-    source_name = source_url.split("/")[-1].split(".")[0]
-    source_dir = settings.TEMP_PLUGGET / source_name
+_source_locks = {}  # source_dir: lock, to avoid refreshing the same manifest repo in parallel
+_refresh_threads = {}  # source_dir: thread, running background refreshes
 
-    if use_cache:
-        return source_dir
 
-    # by default disable caching for now, it hinders debugging
-    # great for instant search results though
-    if os.environ.get('PLUGGET_USE_CACHE') == 1:
-        # CACHING: check when repo was last updated
-        if (source_dir / "_LAST_UPDATED").exists():
-            with open(source_dir / "_LAST_UPDATED", "r") as f:
-                last_updated = datetime.datetime.strptime(f.read(), "%Y-%m-%d %H:%M:%S")
-            if last_updated > datetime.datetime.now() - datetime.timedelta(days=1):
-                print("using cached manifest repo, last updated less than a day ago")
-                return source_dir
-
-    # remove old manifest repo
-    rmdir(source_dir)  # todo catch if this failed
-    # check if dir exists
-    if source_dir.exists():
-        raise Exception(f"Failed to remove source_dir {source_dir}")
-
-    # clone repo
-    commands = ["git", "clone", "--depth", "1", "--progress", source_url, str(source_dir)]
-    process = subprocess.Popen(commands, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
-    stdout, stderr = process.communicate()
+def _run_git(commands, cwd=None, timeout=None) -> "tuple[int, bytes]":
+    """
+    run a git command, log the output, returns the returncode and stdout
+    timeout: kill the command after this many seconds, the returncode is then -1
+    """
+    process = subprocess.Popen(commands, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    try:
+        stdout, stderr = process.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        stdout, stderr = process.communicate()
+        logging.error(f"git command timed out after {timeout} seconds: {commands}")
+        return -1, stdout
 
     try:
         for line in stdout.splitlines():
@@ -85,45 +82,205 @@ def _clone_manifest_repo(source_url, use_cache=False) -> "pathlib.Path":
         if stderr:
             for line in stderr.splitlines():
                 logging.error(line)
-    except Ellipsis as e:
-        logging.error("Failed to log git clone output, likely decode issue")
+    except Exception as e:
+        logging.error("Failed to log git output, likely decode issue")
         logging.error(e)
 
-    # todo check if command errored / catch exception
-    # todo check if clone was successful
+    return process.returncode, stdout
+
+
+def _get_remote_head(source_url) -> "str|None":
+    """get the commit hash of the remote HEAD, without fetching any objects"""
+    returncode, stdout = _run_git(["git", "ls-remote", source_url, "HEAD"], timeout=settings.source_timeout)
+    if returncode != 0 or not stdout.strip():
+        return None
+    return stdout.split()[0].decode()
+
+
+def _get_local_head(source_dir: Path) -> "str|None":
+    """get the commit hash of the cloned manifest repo, recorded in _LAST_COMMIT"""
+    if not (source_dir / "_LAST_COMMIT").exists():
+        return None
+    return (source_dir / "_LAST_COMMIT").read_text().strip() or None
+
+
+def _update_manifest_repo(source_dir: Path, target_dir: Path, remote_head: str = None) -> bool:
+    """
+    fetch only new commits into the existing clone of the manifest repo, and write the new manifests to target_dir
+    the manifests in source_dir aren't changed, so searches can keep reading them until target_dir is swapped in.
+    the .git folder is moved to target_dir, instead of copied
+    remote_head: the commit to fetch, defaults to the remote HEAD
+    returns False if the repo couldn't be updated, and needs a fresh clone
+    """
+    git_dir = source_dir / ".git"
+    if not git_dir.exists():
+        return False
+
+    returncode, _ = _run_git(["git", "fetch", "--depth", "1", "origin", remote_head or "HEAD"], cwd=source_dir,
+                             timeout=settings.source_timeout)
+    if returncode != 0:
+        return False
+    try:
+        _mirror.extract_archive(git_dir, "FETCH_HEAD", target_dir)
+    except Exception as e:
+        logging.warning(f"failed to write the fetched manifests to '{target_dir}': {e}")
+        return False
+
+    # point the repo to the fetched commit, without checking out the files again
+    git_dir.rename(target_dir / ".git")
+    returncode, _ = _run_git(["git", "update-ref", "HEAD", "FETCH_HEAD"], cwd=target_dir)
+    if returncode != 0:
+        return False
+    returncode, _ = _run_git(["git", "read-tree", "HEAD"], cwd=target_dir)
+    return returncode == 0
+
+
+def _get_source_age(source_dir: Path) -> "datetime.timedelta|None":
+    """get the time since the manifest repo was last updated, None if it was never cloned"""
+    if not (source_dir / "_LAST_UPDATED").exists():
+        return None
+    with open(source_dir / "_LAST_UPDATED", "r") as f:
+        last_updated = datetime.datetime.strptime(f.read(), "%Y-%m-%d %H:%M:%S")
+    return datetime.datetime.now() - last_updated
+
+
+def _refresh_manifest_repo(source_url, source_dir: Path) -> None:
+    """update the manifest repo to the latest commit, clone it if needed"""
+    # only 1 refresh per source at a time, e.g. a forced refresh while a background refresh is running
+    with _source_locks.setdefault(str(source_dir), threading.Lock()):
+
+        is_catalog = _catalog.is_catalog_url(source_url)
+        remote_head = _get_remote_head(source_url) if not is_catalog and (source_dir / ".git").exists() else None
+
+        if is_catalog:
+            # a catalog replaces the git repo, with a single download
+            _catalog.fetch_catalog(source_url, source_dir)
+
+        elif remote_head and remote_head == _get_local_head(source_dir):
+            logging.debug(f"manifest repo '{source_url}' is up to date: {remote_head}")
+
+        else:
+            # update a copy of the repo, and swap it in when it's done
+            # so a search reading the repo (e.g. during a background refresh) never sees a half updated repo
+            new_dir = source_dir.with_name(f"{source_dir.name}_new")
+            rmdir(new_dir, wait=True)
+
+            # try to only fetch the new commits, else fall back to a fresh clone
+            if not _update_manifest_repo(source_dir, new_dir, remote_head):
+                rmdir(new_dir, wait=True)
+                if new_dir.exists():
+                    raise Exception(f"Failed to remove folder {new_dir}")
+                returncode, _ = _run_git(["git", "clone", "--depth", "1", "--progress", source_url, str(new_dir)],
+                                         timeout=settings.source_timeout)
+                if returncode != 0:
+                    rmdir(new_dir)
+                    raise Exception(f"Failed to clone manifest repo '{source_url}'")
+
+            # save the resolved commit, so the next refresh can skip the fetch if the remote didn't change
+            returncode, stdout = _run_git(["git", "rev-parse", "HEAD"], cwd=new_dir)
+            if returncode == 0:
+                with open(new_dir / "_LAST_COMMIT", "w") as f:
+                    f.write(stdout.decode().strip())
+            swap_dir(new_dir, source_dir)
+
+        # CACHING: make a file inside named _LAST_UPDATED with the current date
+        source_dir.mkdir(parents=True, exist_ok=True)
+        with open(source_dir / "_LAST_UPDATED", "w") as f:
+            f.write(datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+
+
+def _refresh_manifest_repo_in_background(source_url, source_dir: Path) -> None:
+    """refresh a stale manifest repo in a background thread, so searches don't wait on git"""
+    def _refresh():
+        try:
+            _refresh_manifest_repo(source_url, source_dir)
+        except Exception as e:
+            logging.error(f"background refresh of manifest repo '{source_url}' failed: {e}")
+
+    thread = _refresh_threads.get(str(source_dir))
+    if thread and thread.is_alive():
+        return
+    logging.info(f"refreshing manifest repo '{source_url}' in the background")
+    thread = threading.Thread(target=_refresh, name=f"plugget-refresh-{source_dir.name}", daemon=True)
+    _refresh_threads[str(source_dir)] = thread
+    thread.start()
+
+
+def _clone_manifest_repo(source_url, use_cache=False, refresh=False) -> "pathlib.Path":
+    """
+    Clone git repo containing plugget manifests, from a git URL, or download the catalog for catalog sources
+    use_cache: return the cloned repo as is, without checking if it's outdated
+    refresh: update the repo now, even if it's not outdated. set env var PLUGGET_USE_CACHE to 0 to always refresh
+
+    a repo older than settings.source_ttl is returned right away, and refreshed in a background thread
+    """
+    if _catalog.is_catalog_url(source_url):
+        source_name = _catalog.source_dir_name(source_url)
+    else:
+        source_name = source_url.split("/")[-1].split(".")[0]
+    source_dir = settings.TEMP_PLUGGET / source_name
+
+    if use_cache:
+        return source_dir
+
+    # disable caching, handy when debugging manifests
+    if os.environ.get('PLUGGET_USE_CACHE') == "0":
+        refresh = True
 
-    # CACHING: make a file inside named _LAST_UPDATED with the current date
-    source_dir.mkdir(parents=True, exist_ok=True)
-    with open(source_dir / "_LAST_UPDATED", "w") as f:
-        f.write(datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+    # CACHING: check when repo was last updated
+    age = _get_source_age(source_dir)
+    if age is not None and not refresh:
+        if age > datetime.timedelta(seconds=settings.source_ttl):
+            # stale-while-revalidate: search the cached repo, the next search will use the refreshed repo
+            _refresh_manifest_repo_in_background(source_url, source_dir)
+        return source_dir
 
+    _refresh_manifest_repo(source_url, source_dir)
     return source_dir
 
 
-def _clone_manifest_repos(use_cache=False):
+def _get_source_dir(source_url, use_cache=False, refresh=False) -> Path:
+    """get the local folder for a registered source, clone the repo if the source is a git URL"""
+    # first check if path is a local path
+    source_dir = Path(source_url)
+
+    exists = False
+    try:
+        exists = source_dir.exists()
+    except OSError as e:
+        # source_dir.exists triggers OSError if it's a git URL (in older versions of python?)
+        pass
+
+    if not exists or _catalog.is_catalog_url(source_url):  # todo fix this naive impicit approach
+        # else assume it's a git URL, or a catalog file
+        # we then clone the repo to a temp folder, and save the path in source_dir
+        source_dir = _clone_manifest_repo(source_url, use_cache=use_cache, refresh=refresh)
+
+    if not source_dir.exists():
+        raise FileNotFoundError(f"source folder not found: '{source_dir}'")
+    return source_dir
+
+
+def _clone_manifest_repos(use_cache=False, refresh=False):
     """
     clone the manifest repos that are registered, defaults to ['github.com/plugget/plugget-pkgs']
+    sources are fetched in parallel, a failing source is logged and skipped
     """
+    # sort the sources, so the search results are in a stable order
+    source_urls = sorted(settings.sources)
+
     # if repo doesn't exist, clone it
+    max_workers = max(1, min(settings.source_workers, len(source_urls)))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(_get_source_dir, source_url, use_cache=use_cache, refresh=refresh)
+                   for source_url in source_urls]
+
     source_dirs = []
-    for source_url in settings.sources:
-        
-            # first check if path is a local path
-            source_dir = Path(source_url)
-
-            exists = False
-            try:
-                exists = source_dir.exists()
-            except OSError as e:
-                # source_dir.exists triggers OSError if it's a git URL (in older versions of python?)
-                pass
-
-            if not exists:  # todo fix this naive impicit approach
-                # else assume it's a git URL
-                # we then clone the repo to a temp folder, and save the path in source_dir
-                source_dir = _clone_manifest_repo(source_url, use_cache=use_cache)
-                
-            source_dirs.append(source_dir)
+    for source_url, future in zip(source_urls, futures):
+        try:
+            source_dirs.append(future.result())
+        except Exception as e:
+            logging.error(f"failed to get manifest source '{source_url}': {e}")
 
     return source_dirs
 
@@ -162,52 +319,164 @@ def _get_app_paths(search_paths: "list[pathlib.Path]", app: str = None):
     if app == 'all':
         child_folder_paths = []
         for search_path in search_paths:
-            child_folder_paths.extend([search_path / child for child in search_path.iterdir() if child.is_dir()])
+            child_folder_paths.extend([child for child in search_path.iterdir()
+                                       if child.is_dir() and not child.name.startswith(".")])  # skip .git
         search_paths = child_folder_paths
 
     return search_paths
 
 
-def search(name=None, app=None, verbose=True, version=None, use_cache:bool=False, installed:bool=False) -> "typing.List[PackagesMeta]":
+def _get_index_entries(source_dir: Path) -> "list[dict]":
+    """get the manifest index for a source dir, (re)build it if the source changed"""
+    # the revision & manifests are read from the same repo, not a repo swapped in by a refresh halfway
+    with dir_lock(source_dir).read():
+        entries = _index.load_index(source_dir)
+        if entries is None:
+            logging.info(f"building manifest index for source '{source_dir}'")
+            app_paths = _get_app_paths(search_paths=[source_dir], app="all")
+            manifest_paths = _discover_manifest_paths(search_paths=app_paths)
+            entries = _index.build_index(source_dir, manifest_paths)
+    return entries
+
+
+def _load_index_entries(source_dirs: "list[Path]") -> "list[dict]":
+    """get the manifest index entries for all sources"""
+    entries = []
+    for source_dir in source_dirs:
+        entries.extend(_get_index_entries(source_dir))
+    return entries
+
+
+def _filter_index_entries(entries: "list[dict]", name: str = None, app: str = None) -> "list[dict]":
+    """
+    filter index entries on app and package name, see _get_app_paths and _discover_manifest_paths
+    app: can be set to a specific app name, or to 'all' to get all apps
+    """
+    app = app or _detect_app_id()  # e.g. blender
+    if app != "all":
+        entries = [entry for entry in entries if entry["app"] == app]
+    if name is not None:
+        entries = [entry for entry in entries if name.lower() in entry["package_name"].lower()]
+    return entries
+
+
+def _rank_index_entries(entries: "list[dict]", query: str) -> "list[dict]":
+    """
+    sort index entries by relevance for the search query, and drop entries that don't match
+    full text matches on name, tags, author and description, see _index.rank
+    a match on the package name (the old search behavior) ranks higher
+    """
+    query_lower = query.lower()
+    ranks = {}  # source_dir: {app/package_name: score}
+    scored_entries = []
+    for entry in entries:
+        source_dir = entry["source_dir"]
+        if source_dir not in ranks:
+            ranks[source_dir] = _index.rank(source_dir, query)
+        score = ranks[source_dir].get(f"{entry['app']}/{entry['package_name']}", 0)
+
+        package_name = entry["package_name"].lower()
+        if package_name == query_lower:
+            score += 100
+        elif package_name.startswith(query_lower):
+            score += 20
+        elif query_lower in package_name:
+            score += 10
+
+        if score:
+            scored_entries.append((score, entry))
+
+    scored_entries.sort(key=lambda x: (-x[0], x[1]["package_name"].lower()))  # stable order for equal scores
+    return [entry for score, entry in scored_entries]
+
+
+def _limit_index_entries(entries: "list[dict]", limit: int) -> "list[dict]":
+    """keep the entries of the first packages, so we don't create PackagesMeta instances for dropped results"""
+    packages = set()
+    limited_entries = []
+    for entry in entries:
+        package = (str(entry["source_dir"]), entry["app"], entry["package_name"])
+        if package not in packages:
+            if len(packages) >= limit:
+                continue
+            packages.add(package)
+        limited_entries.append(entry)
+    return limited_entries
+
+
+def _meta_packages_from_index_entries(entries: "list[dict]") -> "list[PackagesMeta]":
+    """group index entries per package folder, and only parse the manifests of those packages. keeps the order"""
+    manifest_paths_per_dir = {}
+    for entry in entries:
+        manifest_path = entry["manifest_path"]
+        manifest_paths_per_dir.setdefault(manifest_path.parent, []).append(manifest_path)
+    return [PackagesMeta(manifests_dir=manifests_dir, manifest_paths=manifest_paths)
+            for manifests_dir, manifest_paths in manifest_paths_per_dir.items()]
+
+
+def _search_installed(name=None, app=None) -> "list[PackagesMeta]":
+    """get the installed packages from the installed registry, without using the manifest repos"""
+    app = app or _detect_app_id()  # e.g. blender
+    apps = _registry.installed_apps() if app == "all" else [app] if app else []
+
+    meta_packages = []
+    for app_name in apps:
+        for package_name, manifest_paths in _registry.installed_manifest_paths(app_name).items():
+            if name is not None and name.lower() not in package_name.lower():
+                continue
+            # the installed manifests are in INSTALLED_DIR / app / app_hash / package_name / version.json
+            meta_packages.append(PackagesMeta(manifests_dir=manifest_paths[0].parent, manifest_paths=manifest_paths,
+                                              app=app_name, package_name=package_name))
+    return meta_packages
+
+
+def search(name=None, app=None, verbose=True, version=None, use_cache:bool=False, installed:bool=False,
+           refresh:bool=False, limit:int=None) -> "typing.List[PackagesMeta]":
     """
     Search if package is in sources
     :param name: pacakge name to search in manifest repo, return all packages if not set
+                 also matches words in the description, tags and author. results are sorted by relevance
     :param app: app name to search in, return all apps if not set
     :param verbose: print results if True
     search_paths: list of pathlib.Path objects to search in,
                 defaults to temp path of clone for all registered manifest repos
     installed: filter results to only installed packages
     use_cache: don't re-clone the manifest repos, use cached version
+    refresh: update the manifest repos now, instead of waiting for settings.source_ttl to expire
+    limit: max amount of results to return, e.g. the top 20 matches
     """
     # search a folder with the format: app/app-hash/package/manifest-version.json, e.g.:
     # Blender/8e3c1114/io_xray/1.2.3.json
 
     if installed:
-        use_cache = True
-    
-    # clone
-    search_paths = _clone_manifest_repos(use_cache=use_cache)
-    search_paths = _get_app_paths(search_paths=search_paths, app=app)
-
-    manifest_paths = _discover_manifest_paths(name=name, search_paths=search_paths)
-    manifest_dirs = {manifest_path.parent for manifest_path in manifest_paths}
+        # installed packages are saved in the installed registry in roaming, no need for the manifest repos
+        # this currently checks if isntalled in active app.
+        # todo support external querying of installed packages
+        meta_packages = _search_installed(name=name, app=app)
 
-    # meta packages point to manifests, in the plugget packages temp repo
-    meta_packages = [PackagesMeta(manifests_dir=manifest_dir) for manifest_dir in manifest_dirs]
+    else:
+        # clone
+        source_dirs = _clone_manifest_repos(use_cache=use_cache, refresh=refresh)
 
-    if installed:
-        # TODO we dont save installed status to temp anymore
-        # its now in roaming
+        # query the manifest index, instead of parsing all manifests in the source repos
+        entries = _load_index_entries(source_dirs)
+        entries = _filter_index_entries(entries, app=app)
+        if name:
+            entries = _rank_index_entries(entries, name)
+        if limit and not version:  # with a version filter, we only know the results after creating them
+            entries = _limit_index_entries(entries, limit)
 
-        # this currently checks if isntalled in active app.
-        # todo support external querying of installed packages
-        meta_packages = [x for x in meta_packages if x.installed_package]
+        # meta packages point to manifests, in the plugget packages temp repo
+        meta_packages = _meta_packages_from_index_entries(entries)
 
     if version:
         meta_packages = [x for x in meta_packages if x.get_version(version)]
         for meta_package in meta_packages:
             meta_package.active_version = version
 
+    if limit:
+        meta_packages = meta_packages[:limit]
+
     if verbose:
         _print_search_results(meta_packages)
     return meta_packages
@@ -257,15 +526,51 @@ def load_package_config_data_from_file(path) -> "list[tuple[str, str, str]]":
     return packages_info
 
 
-def packages_from_config_file(path):
-    packages_info = load_package_config_data_from_file(path)
+def resolve_packages(packages_info: "list[tuple[str, str, str]]") -> "tuple[list[PackagesMeta], list[str]]":
+    """
+    find the packages for a list of (app_name, package_name, version), in a single pass over the manifest index
+    returns the found packages, and the unresolved entries formatted as app_name:package_name==version
+    """
+    source_dirs = _clone_manifest_repos()
+    entries = _load_index_entries(source_dirs)
+
+    # group the index once, so every lookup is a dict lookup instead of a new search
+    entries_per_package = {}
+    for entry in entries:
+        key = (entry["app"], entry["package_name"].lower())
+        entries_per_package.setdefault(key, []).append(entry)
+
+    default_app = None
     packages = []
-    search("")  # empty search to create the temp plugget repo, so we can use cache later
+    unresolved = []
     for app_name, package_name, version in packages_info:
-        results = search(package_name, app=app_name, version=version, use_cache=True)
+        if not app_name:
+            default_app = default_app or _detect_app_id()
+            app_name = default_app
+
+        matched_entries = entries_per_package.get((app_name, package_name.lower()))
+        if matched_entries:
+            results = _meta_packages_from_index_entries(matched_entries)
+        else:
+            # no exact match, fall back to search behavior: match part of the package name
+            results = _meta_packages_from_index_entries(_filter_index_entries(entries, name=package_name, app=app_name))
+
+        if version:
+            results = [x for x in results if x.get_version(version)]
+            for meta_package in results:
+                meta_package.active_version = version
+
         if not results:
-            logging.warning(f"package not found: {package_name}, version {version}, for app: {app_name}")
+            unresolved.append(f"{app_name}:{package_name}" + (f"=={version}" if version else ""))
         packages.extend(results)
+    return packages, unresolved
+
+
+def packages_from_config_file(path):
+    packages_info = load_package_config_data_from_file(path)
+    packages, unresolved = resolve_packages(packages_info)
+    if unresolved:
+        logging.warning(f"{len(unresolved)} packages not found in '{path}': {', '.join(unresolved)}")
     return packages
 
 
@@ -327,6 +632,19 @@ def install(package_name, enable=True, app=None, version=None, **kwargs):
     # uninstall if unsuccessful?
 
 
+def install_config(path, force=False, **kwargs) -> "list[Package]":
+    """
+    install all packages in a config file, e.g. a studio config with a line per package: blender:bqt==0.1.0
+    the content of all packages downloads in parallel, before running the install actions one by one
+    returns the packages that were requested
+    """
+    # latest returns the version from the config if set, see PackagesMeta.active_version
+    packages = [meta_package.latest for meta_package in packages_from_config_file(path)]
+    packages = [p for p in packages if p]
+    install_packages(packages, force=force, **kwargs)
+    return packages
+
+
 def uninstall(package_name=None, dependencies=False, **kwargs):
     """
     Uninstall package
@@ -421,6 +739,17 @@ def open_installed_dir(*args, **kwargs):
     os.startfile(settings.INSTALLED_DIR)
 
 
+def build_catalog(output_path, source=None) -> Path:
+    """
+    Build a catalog file from a manifest repo, to use as a faster source than cloning the repo
+    :param output_path: path to the catalog to create, e.g. 'plugget-pkgs.jsonl.gz'
+    :param source: manifest repo folder or git URL, defaults to the first registered source
+    """
+    source = source or sorted(settings.sources)[0]
+    source_dir = _get_source_dir(source, refresh=True)
+    return _catalog.build_catalog(source_dir, output_path)
+
+
 def help(object=None):
     """
     List all available commands
@@ -4,7 +4,12 @@ import json
 import logging
 from plugget._utils import rmdir
 from plugget import settings
+from plugget import _registry
+from plugget import _mirror
+from plugget import _deploy
+import plugget.cache
 import importlib
+import concurrent.futures
 import shutil
 import sys
 import hashlib
@@ -46,6 +51,22 @@ def open_folder(path: str):
     # todo print output of run
 
 
+def _run_log(command, cwd=None) -> int:
+    """run a command, print the output, and return the returncode"""
+    logging.info(f"command: '{command}'")
+    process = subprocess.Popen(command, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    stdout, stderr = process.communicate()
+    try:
+        if stdout:
+            print(stdout.decode())
+        if stderr:
+            logging.error(stderr.decode())
+    except Exception as e:
+        logging.error(f"error printing stdout/stderr: '{e}'")
+        logging.error(f"stdout: '{stdout}'")
+    return process.returncode
+
+
 class Package(object):
     """
     Manifest & package wrapper
@@ -60,7 +81,8 @@ class Package(object):
                  description=None, author=None, repo_url=None, package_url=None, license=None, tags=None,
                  dependencies=None, repo_paths=None, docs_url=None, package_name=None, manifest_path=None,
                  install_actions=None, actions=None, enable_default_actions=True,
-                 installed_paths=None, repo_SHA=None, repo_tag=None, packages_meta=None, **kwargs):
+                 installed_paths=None, repo_SHA=None, repo_tag=None, packages_meta=None, sha256=None, file_hashes=None,
+                 **kwargs):
         """
         app: the application this plugin is for e.g. blender
         name: the name of the plugin e.g. bqt (currently same as display_name)
@@ -69,6 +91,8 @@ class Package(object):
         id: the unique id of the plugin e.g. bqt (not used)
         repo_paths: a list containing the subdirectory of the repo where the plugin is located, this becomes pluginname in blender, can contain multiple paths or files
         version: the version of the plugin e.g. 0.1.0, derived from manifest name
+        sha256: optional checksum of the github zip download, at repo_SHA or repo_tag
+            for other git servers, the checksum of the downloaded content, see _deploy.content_sha256
 
         packages by default load from manifests in a temp folder
         once installed, they are installed in a permanent folder
@@ -92,6 +116,7 @@ class Package(object):
         self.repo_paths: "list[str]" = repo_paths  # subdir(s)
         self.repo_SHA = repo_SHA
         self.repo_tag = repo_tag
+        self.sha256 = sha256  # checked before extracting the download, so a corrupt download is never installed
         self.package_url = package_url  # set before self.plugin_name # todo AFAIK not used yet
          # self.name = name #or self.plugin_name
         self.docs_url = docs_url
@@ -108,6 +133,8 @@ class Package(object):
         # 3. package settings
 
         self.installed_paths: set = set() if installed_paths is None else set(installed_paths)   # list of files cloned locally
+        # ledger of the installed files, {installed path: {relative file path: {sha256, stat}}}, see Package.deploy
+        self.file_hashes: "dict[str, dict[str, dict]]" = file_hashes or {}
         # since self.installed_paths is not present in the downloaded manifest,
         # we load the attrs from the installed manifest
         self.load_attrs_from_installed_manifest()
@@ -115,7 +142,11 @@ class Package(object):
         self._starred = None
         self._stars = None
         self._clone_dir = None
+        self._cached_content_dir = None  # the cache entry the clone dir was deployed from
         self._content_paths = []  # used for caching, to prevent cloning multiple times
+        self._previous_file_hashes = {}  # ledger of the version we upgrade from, see _run_install_actions
+        self._dependency_packages = []  # dependencies installed with this package, see _collect_install_set
+        self._requirements_installed = False  # True if a dependent package installed our requirements
         self.packages_meta = packages_meta or None  # optional backlink to the packages meta object # todo make it not optional?
 
     # @property
@@ -206,7 +237,8 @@ class Package(object):
 
         # backward compatible when self.installed_manifest_path didnt exist
         # else:
-        return (self.package_install_dir / f"{self.version}.json").exists()
+        # the registry is kept in sync with the installed manifests, see save_installed_manifest
+        return self.version in _registry.installed_versions(self.app, self.package_name)
 
     @property
     def default_install_actions(self):
@@ -361,6 +393,7 @@ class Package(object):
                   'repo_url': self.repo_url,
                   'repo_paths': self.repo_paths,
                   'self.repo_SHA': self.repo_SHA,
+                  'sha256': self.sha256,
                   'package_url': self.package_url,
                   'docs_url': self.docs_url,
                   'install_actions': self._install_actions,
@@ -368,6 +401,7 @@ class Package(object):
                   "enable_default_actions": self.enable_default_actions,
                   'dependencies': self.dependencies,
                   'installed_paths': [str(x) for x in self.installed_paths],
+                  'file_hashes': self.file_hashes,
                   }
 
         if not empty_keys:
@@ -412,67 +446,183 @@ class Package(object):
     def open_repo_URL(self):
         webbrowser.open(self.repo_url)
 
-    def _clone_repo(self, target_dir=None) -> "list[Path]":
+    def _resolve_repo_ref(self) -> "str|None":
         """
-        returns either the files in repo (sparse) or the folder containing the repo
+        get the git reference of the content to download: the commit SHA, the tag, or the SHA of the remote HEAD
+        returns None if the remote HEAD can't be resolved, e.g. when git isn't installed
         """
-        if not self.repo_url:
-            logging.info(f"skipping repo clone since repo is not set")
-            return []
+        if self.repo_SHA:
+            return self.repo_SHA
+        if self.repo_tag:
+            return f"tags/{self.repo_tag}"
+        try:
+            process = subprocess.run(["git", "ls-remote", self.repo_url, "HEAD"],
+                                     stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=settings.source_timeout)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            logging.warning(f"failed to resolve HEAD of '{self.repo_url}': {e}")
+            return None
+        if process.returncode != 0 or not process.stdout.strip():
+            return None
+        return process.stdout.split()[0].decode()
+
+    def _download_repo(self, target_dir: Path, ref: str = None) -> None:
+        """
+        download the repo content to an empty target_dir, without the .git folder
+        ref: the resolved git reference, see _resolve_repo_ref
+        """
+        logging.info(f"cloning '{self.repo_url}' to '{target_dir}'")
 
-        self._clone_dir = target_dir or self.clone_dir
-        # todo if we clone to a diff dir, we should save the package
+        # logging.debug(f"cloning {self.repo_url} to {target_dir}")
+        # subprocess.run(["git", "clone", "--depth", "1", "--progress", self.repo_url, str(target_dir)])
+        # todo this doesnt always print the error, see unreal plugget for example with errors
 
-        # clone package repo to temp folder
-        rmdir(self._clone_dir)
+        # ensure target dir exists.
+        target_dir.mkdir(exist_ok=True, parents=True)
 
-        logging.info(f"cloning '{self.repo_url}' to '{self._clone_dir}'")
-        # todo sparse checkout, support multiple entries in self.repo_paths
+        unpinned = not self.repo_SHA and not self.repo_tag
+        zip_download = "https://github.com" in self.repo_url and (unpinned or self.sha256)
+        if zip_download:
+            # it's faster to download a zip instead of clone the repo
+            # and plugget now works without git installed !
+            # only the repo_paths are extracted, actions don't use other files
+            # the sha256 checksum is for the zip, so pinned packages with a checksum download the zip too
+            import plugget._utils
+            plugget._utils.download_github_repo(self.repo_url, str(target_dir), ref=ref, paths=self.repo_paths,
+                                                sha256=self.sha256)
+            print("download ZIP instead of clone")
+        elif ref and self._export_from_mirror(target_dir, ref):
+            print(f"exported '{ref}' from mirror")
+        elif not self._sparse_clone(target_dir, ref):
+            logging.warning(f"partial clone failed, falling back to a full clone of '{self.repo_url}'")
+            rmdir(target_dir)
+            self._full_clone(target_dir)
 
-        # logging.debug(f"cloning {self.repo_url} to {self._clone_dir}")
-        # subprocess.run(["git", "clone", "--depth", "1", "--progress", self.repo_url, str(self._clone_dir)])
-        # todo this doesnt always print the error, see unreal plugget for example with errors
+        # delete .git folder
+        rmdir(target_dir / ".git")
 
-        # ensure target dir exists.
-        self._clone_dir.mkdir(exist_ok=True, parents=True)
+        # check if target dir contains any files
+        if not any(p.name != ".git" for p in target_dir.iterdir()):
+            raise Exception(f"Failed to clone repo to {target_dir}")
+
+        # the zip download checked its own checksum, git doesn't download an archive, so check the files
+        if self.sha256 and not zip_download:
+            content_sha256 = _deploy.content_sha256(target_dir)
+            if content_sha256.lower() != self.sha256.lower():
+                rmdir(target_dir)
+                raise Exception(f"checksum mismatch for '{self.repo_url}': "
+                                f"expected sha256 '{self.sha256}', got content sha256 '{content_sha256}'")
+
+    def _export_from_mirror(self, target_dir: Path, ref: str) -> bool:
+        """
+        export the content from a local mirror of the repo, so other versions of the package only fetch new objects
+        returns False if the export failed, e.g. git isn't installed
+        """
+        try:
+            _mirror.export(self.repo_url, ref, target_dir, self.repo_paths)
+            return True
+        except Exception as e:
+            logging.warning(f"failed to export '{self.repo_url}' from mirror: {e}")
+            rmdir(target_dir)
+            target_dir.mkdir(exist_ok=True, parents=True)
+            return False
+
+    def _sparse_clone(self, target_dir: Path, ref: str = None) -> bool:
+        """
+        fetch a single commit without file contents (partial clone), then checkout only the repo_paths (sparse checkout)
+        so plugins in a big (mono)repo only download the files they need
+        ref: commit SHA or 'tags/<tag>', defaults to the remote HEAD
+        returns False if a git command failed, e.g. an old git version, or a server without partial clone support
+        """
+        if self.repo_SHA:
+            fetch_ref = self.repo_SHA  # fetch the pinned commit directly, no need to clone HEAD first
+        elif self.repo_tag:
+            fetch_ref = f"refs/tags/{self.repo_tag}"
+        elif ref and ref.startswith("tags/"):
+            fetch_ref = f"refs/{ref}"
+        else:
+            fetch_ref = ref or "HEAD"
 
-        def run_log(command, cwd=None) -> int:
-            logging.info(f"command: '{command}'")
-            process = subprocess.Popen(command, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
-            stdout, stderr = process.communicate()
+        def run(*command) -> bool:
             try:
-                if stdout:
-                    print(stdout.decode())
-                if stderr:
-                    logging.error(stderr.decode())
-            except Exception as e:
-                logging.error(f"error printing stdout/stderr: '{e}'")
-                logging.error(f"stdout: '{stdout}'")
-            return process.returncode
+                return _run_log(list(command), cwd=target_dir) == 0
+            except OSError as e:  # e.g. git is not installed
+                logging.warning(f"failed to run git: {e}")
+                return False
 
+        if not run("git", "init", "--quiet") or not run("git", "remote", "add", "origin", self.repo_url):
+            return False
+        if self.repo_paths:
+            # non-cone patterns, so repo_paths can be files or folders. always include the root requirements.txt
+            patterns = ["/" + p.replace("\\", "/").strip("/") for p in self.repo_paths] + ["/requirements.txt"]
+            (target_dir / ".git" / "info").mkdir(parents=True, exist_ok=True)
+            (target_dir / ".git" / "info" / "sparse-checkout").write_text("\n".join(patterns) + "\n")
+            if not run("git", "config", "core.sparseCheckout", "true"):
+                return False
+        return (run("git", "fetch", "--depth", "1", "--filter=blob:none", "--progress", "origin", fetch_ref)
+                and run("git", "checkout", "--quiet", "FETCH_HEAD"))
+
+    def _full_clone(self, target_dir: Path) -> None:
+        """clone the whole repo, for git servers or versions that don't support partial clones"""
+        target_dir.mkdir(exist_ok=True, parents=True)
         if self.repo_SHA:
             # todo check if repo_SHA is valid
-            run_log(["git", "clone", "--depth", "1", "--progress", self.repo_url, str(self._clone_dir)])
-            run_log(["git", "fetch", "--depth", "1", "origin", self.repo_SHA], cwd=self._clone_dir)
-            run_log(["git", "checkout", self.repo_SHA], cwd=self._clone_dir)
+            _run_log(["git", "clone", "--depth", "1", "--progress", self.repo_url, str(target_dir)])
+            _run_log(["git", "fetch", "--depth", "1", "origin", self.repo_SHA], cwd=target_dir)
+            _run_log(["git", "checkout", self.repo_SHA], cwd=target_dir)
         elif self.repo_tag:
-            # subprocess.run(["git", "checkout", f"tags/{self.repo_tag}"], cwd=self._clone_dir)
-            run_log(["git", "clone", "--depth", "1", "--branch", self.repo_tag,  "--progress", self.repo_url, str(self._clone_dir)])
-        elif "https://github.com" in self.repo_url:
-            # it's faster to download a zip instead of clone the repo
-            # and plugget now works without git installed !
-            import plugget._utils
-            plugget._utils.download_github_repo(self.repo_url, str(self._clone_dir))  # todo support branch and tags
-            print("download ZIP instead of clone")
+            # subprocess.run(["git", "checkout", f"tags/{self.repo_tag}"], cwd=target_dir)
+            _run_log(["git", "clone", "--depth", "1", "--branch", self.repo_tag,  "--progress", self.repo_url, str(target_dir)])
         else:
-            run_log(["git", "clone", "--depth", "1", "--progress", self.repo_url, str(self._clone_dir)])
+            _run_log(["git", "clone", "--depth", "1", "--progress", self.repo_url, str(target_dir)])
 
-        # delete .git folder
-        rmdir(self._clone_dir / ".git")
+    def _get_cached_content(self) -> "Path|None":
+        """
+        get the repo content from the content cache, download it to the cache if needed
+        returns None if the content can't be cached, e.g. when the git reference can't be resolved
+        """
+        ref = self._resolve_repo_ref()
+        if not ref:
+            return None
+
+        # downloads can contain only the repo_paths, so packages sharing a repo don't share partial content
+        paths = self.repo_paths
+        with plugget.cache.lock(self.repo_url, ref, paths):
+            content_dir = plugget.cache.get(self.repo_url, ref, paths)
+            if content_dir:
+                logging.info(f"using cached content for '{self.repo_url}' @ '{ref}'")
+                return content_dir
+
+            download_dir = plugget.cache.new_download_dir()
+            try:
+                self._download_repo(download_dir / "content", ref=ref)
+                return plugget.cache.add(self.repo_url, ref, download_dir / "content", paths)
+            finally:
+                shutil.rmtree(download_dir, ignore_errors=True)
 
-        # check if target dir contains any files
-        if not any(self._clone_dir.iterdir()):
-            raise Exception(f"Failed to clone repo to {self._clone_dir}")
+    def _clone_repo(self, target_dir=None) -> "list[Path]":
+        """
+        returns either the files in repo (sparse) or the folder containing the repo
+        """
+        if not self.repo_url:
+            logging.info(f"skipping repo clone since repo is not set")
+            return []
+
+        self._clone_dir = target_dir or self.clone_dir
+        # todo if we clone to a diff dir, we should save the package
+
+        # clone package repo to temp folder
+        rmdir(self._clone_dir)
+
+        # the content cache is shared by all apps, we link the content instead of copying it,
+        # so the data is only copied once, when an action deploys it to the app.
+        # actions can move, rename or delete files in the clone dir without changing the cache,
+        # but editing a file in place would edit the cache too
+        cached_content_dir = self._get_cached_content()
+        self._cached_content_dir = cached_content_dir
+        if cached_content_dir:
+            _deploy.deploy(cached_content_dir, self._clone_dir, mode="hardlink")
+        else:
+            self._download_repo(self._clone_dir)
 
         if self.repo_paths:
             return [self._clone_dir / p for p in self.repo_paths]
@@ -480,24 +630,14 @@ class Package(object):
             return [self._clone_dir]
 
     def install(self, force=False, *args, **kwargs) -> None:
-        from plugget import commands
-
-        # todo use packages meta to check if installed
-        if self.is_installed and not force:
-            logging.warning(f"{self.package_name} is already installed")
-            return
+        """install the package and its dependencies, see install_packages"""
+        install_packages([self], force, *args, **kwargs)
 
-        # uninstall is handled by the packages meta,
-        # because else we only check if this package is installed,
-        # and not if other package versions are installed
-        self.packages_meta.uninstall(self.package_name)
-
-        action: "types.ModuleType" = None
-        for action, action_args, action_kwargs in self.install_actions_args_kwargs:
-            # action install implicitly adds to self.install_paths
-            action_kwargs.update(kwargs)  # add kwargs to action_kwargs
-            action.install(self, *args, force=force, *action_args, **action_kwargs)
+    def _resolve_dependencies(self) -> "list[Package]":
+        """get the dependency packages from self.dependencies"""
+        from plugget import commands
 
+        packages = []
         i = 0
         for d in self.dependencies:
             i += 1
@@ -518,7 +658,7 @@ class Package(object):
                 packages_found = commands.search(package_name)
                 if not packages_found:
                     raise Exception(f"dependency '{d}' not found in plugget repo")
-                package = packages_found[0]  # app=app_name, also support python app dependencies
+                package = packages_found[0].latest  # app=app_name, also support python app dependencies
 
             # if the dependency is a dict, it's a package object, e.g. {"name": "my-exporter", "app": "blender"}
             # that's saved in the same manifest file
@@ -531,15 +671,137 @@ class Package(object):
                 d.setdefault("package_name", f"{self.package_name}_dependency_{i}")
                 package = Package(**d)
 
-            package.install(force=force, *args, **kwargs)
+            packages.append(package)
+        return packages
+
+    def _collect_install_set(self, force, install_set: "list[Package]", seen: set) -> None:
+        """add this package and its dependencies to install_set, in install order, skipping installed packages"""
+        key = (self.app, self.package_name)
+        if key in seen:
+            return
+        seen.add(key)
+
+        # todo use packages meta to check if installed
+        if self.is_installed and not force:
+            logging.warning(f"{self.package_name} is already installed")
+            return
+
+        install_set.append(self)
+        self._dependency_packages = []
+        for package in self._resolve_dependencies():
+            package._collect_install_set(force, install_set, seen)
+            # the instance that will be installed, e.g. not a second instance of a shared dependency
+            key = (package.app, package.package_name)
+            installing = next((p for p in install_set if (p.app, p.package_name) == key), None)
+            if installing and installing is not self:
+                self._dependency_packages.append(installing)
+
+    def _run_install_actions(self, force=False, *args, **kwargs) -> None:
+        """install this package from the downloaded content, without dependencies"""
+        if self.packages_meta:
+            previous = self.packages_meta.installed_package
+        else:  # e.g. a dependency defined in the manifest, which has no packages meta
+            previous = self if self.is_installed else None
+
+        upgrade_in_place = bool(previous) and previous._can_upgrade_in_place()
+        if upgrade_in_place:
+            # only changed files are replaced, see Package.deploy
+            logging.info(f"upgrading {self.package_name} {previous.version} -> {self.version} in place")
+            previous_installed_paths = {str(p) for p in previous.installed_paths}
+            self._previous_file_hashes = dict(previous.file_hashes)
+        elif previous:
+            # uninstall is handled by the packages meta,
+            # because else we only check if this package is installed,
+            # and not if other package versions are installed
+            if self.packages_meta:
+                self.packages_meta.uninstall(self.package_name)
+            else:
+                self.uninstall()
+        self.file_hashes = {}
+
+        action: "types.ModuleType" = None
+        for action, action_args, action_kwargs in self.install_actions_args_kwargs:
+            # action install implicitly adds to self.install_paths
+            action_kwargs.update(kwargs)  # add kwargs to action_kwargs
+            action.install(self, *args, force=force, *action_args, **action_kwargs)
+
+        if upgrade_in_place:
+            # remove paths the new version doesn't install anymore, e.g. a renamed addon folder
+            for path in previous_installed_paths - {str(p) for p in self.installed_paths}:
+                print("remove", path)
+                rmdir(path)
+            # replace the manifest of the previous version
+            (self.package_install_dir / f"{previous.version}.json").unlink(missing_ok=True)
+            _registry.remove(self.app, self.package_name)
+            self._previous_file_hashes = {}
 
         # save (slightly modified) manifest to installed packages dir
         # todo check if install was successful
         self.save_installed_manifest()  # save after install, to save the installed dir in the manifest
 
+    def _can_upgrade_in_place(self) -> bool:
+        """
+        True if every installed path has a file hash ledger, so a new version can be installed as a diff
+        e.g. packages installed with actions that don't use Package.deploy need a full uninstall
+        """
+        return bool(self.file_hashes) and all(str(p) in self.file_hashes for p in self.installed_paths)
+
+    def owns_path(self, path: "Path|str") -> bool:
+        """True if the path was installed by the version we're upgrading from, so actions can overwrite it"""
+        return str(path) in self._previous_file_hashes
+
+    def deploy(self, src: "Path|str", dst: "Path|str") -> Path:
+        """
+        install a file or folder from the package content to dst, used by install actions
+        when upgrading, only the files that changed since the previous version are replaced
+        saves a ledger of the installed files, to upgrade the next version as a diff
+        """
+        previous = self._previous_file_hashes.get(str(dst))
+        # the content is only hashed for a diff, and only once per cache entry
+        hashes = self._get_content_hashes(src, compute=previous is not None)
+        self.file_hashes[str(dst)] = _deploy.sync(src, dst, previous, hashes=hashes)
+        return Path(dst)
+
+    def _get_content_hashes(self, src: "Path|str", compute=True) -> "dict[str, str]|None":
+        """
+        get the file hashes of src from the content cache, if src is (part of) the content deployed from the cache
+        returns None if src wasn't deployed from the cache, or its files changed, e.g. renamed by an action
+        """
+        if not self._cached_content_dir or not self._clone_dir:
+            return None
+        try:
+            relative_path = Path(src).resolve().relative_to(Path(self._clone_dir).resolve()).as_posix()
+        except ValueError:
+            return None
+        cached_src = self._cached_content_dir / relative_path
+        if not cached_src.exists():
+            return None
+        hashes = plugget.cache.file_hashes(self._cached_content_dir, compute=compute)
+        if hashes is None:
+            return None
+
+        if relative_path == ".":
+            src_hashes = hashes
+        elif relative_path in hashes:  # a single file
+            src_hashes = {".": hashes[relative_path]}
+        else:
+            prefix = relative_path + "/"
+            src_hashes = {k[len(prefix):]: v for k, v in hashes.items() if k.startswith(prefix)}
+
+        # only use the hashes if src still has the same files as the cache
+        files = dict(_deploy.iter_files(src))
+        if set(files) != set(src_hashes):
+            return None
+        for relative_file_path, file_path in files.items():
+            cached_file_path = cached_src if relative_file_path == "." else cached_src / relative_file_path
+            if os.lstat(file_path).st_size != os.lstat(cached_file_path).st_size:
+                return None
+        return src_hashes
+
     def save_installed_manifest(self):
         installed_manifest_path = self.package_install_dir / f"{self.version}.json"
         self.to_json(installed_manifest_path)
+        _registry.add(self.app, self.package_name, self.version)
 
     def load_attrs_from_installed_manifest(self):
         installed_manifest_path = self.package_install_dir / f"{self.version}.json"
@@ -559,6 +821,43 @@ class Package(object):
         # remove manifest from installed packages dir
         # todo check if uninstall was successful
         shutil.rmtree(self.package_install_dir, ignore_errors=True)
+        _registry.remove(self.app, self.package_name)
+
+
+def fetch_content(packages: "list[Package]", workers: int = None) -> None:
+    """
+    download the content of packages in parallel, so installing many packages takes about as long as the slowest download
+    failed downloads are logged, and retried when the install actions request the content
+    """
+    packages = [p for p in packages if p.repo_url]
+    if not packages:
+        return
+    workers = min(workers or settings.download_workers, len(packages))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(p.get_content): p for p in packages}
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                logging.error(f"failed to download '{futures[future].package_name}': {e}")
+
+
+def install_packages(packages: "list[Package]", force=False, *args, **kwargs) -> None:
+    """
+    install packages and their dependencies, in 2 stages:
+    1. resolve all packages to install, and download their content in parallel
+    2. run the install actions one package at a time, on the calling thread,
+       since app APIs like bpy, maya.cmds and pymxs aren't thread safe
+    """
+    install_set = []
+    seen = set()
+    for package in packages:
+        package._collect_install_set(force, install_set, seen)
+
+    fetch_content(install_set)
+
+    for package in install_set:
+        package._run_install_actions(force, *args, **kwargs)
 
 
 def hash_current_app() -> str:
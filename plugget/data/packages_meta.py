@@ -1,4 +1,9 @@
 import logging
+from pathlib import Path
+
+from plugget import _registry
+from plugget import _version
+from plugget._utils import dir_lock
 
 
 class PackagesMeta:
@@ -8,25 +13,58 @@ class PackagesMeta:
     Notes:
     - Any command run on a PackagesMeta instance will attempt to run on the latest package. see self.__getattr__
     - A PackagesMeta instance is returned by plugget.search()
+    - Manifests are only parsed when a version is requested, e.g. through latest or get_version
 
     Args:
         active_version: used when the user specifies a version in search
         packages: list of Package instances
         manifests_dir: path to the folder containing the package manifests
+        manifest_paths: optional list of manifest paths, e.g. from the manifest index. skips the folder glob
+        app: the app of the package, defaults to the app folder in the manifest repo: app_name/package_name/
+        package_name: defaults to the package folder in the manifest repo
     """
-    def __init__(self, manifests_dir: "pathlib.Path"):
+    def __init__(self, manifests_dir: "pathlib.Path", manifest_paths: "list[pathlib.Path]" = None,
+                 app: str = None, package_name: str = None):
         self.active_version: str = ""  # e.g. '1.0.0', to not install latest by default
-        self.packages: "list" = self.load_packages(manifests_dir)
-        # self.manifests_dir: "pathlib.Path" = manifests_dir
-
-    def load_packages(self, manifests_dir: "pathlib.Path") -> "list":
+        self.manifests_dir: "pathlib.Path" = Path(manifests_dir)
+        if manifest_paths is None:
+            manifest_paths = list(self.manifests_dir.glob("*.json"))
+        # keep in sync with Package._set_data_from_manifest_path
+        self._app: str = app or self.manifests_dir.parent.name
+        self._package_name: str = package_name or self.manifests_dir.name
+        # version stubs, the manifest is parsed on first use, see self._load_package
+        manifest_paths = [p if isinstance(p, Path) else Path(p) for p in manifest_paths]
+        self._manifest_paths: "dict[str, Path]" = {p.stem: p for p in manifest_paths}
+        self._packages: "dict[str, plugget.data.package.Package]" = {}  # version: parsed Package
+        # versions sorted newest first, computed once
+        self._sorted_versions: "list[str]" = _version.sort_versions(self._manifest_paths)
+
+    def _load_package(self, version: str) -> "plugget.data.package.Package":
+        """parse the manifest for this version, once"""
         from plugget.data.package import Package
 
-        manifest_paths = list(manifests_dir.glob("*.json"))
-        packages = [Package.from_json(manifest_path) for manifest_path in manifest_paths]
-        for package in packages:
+        package = self._packages.get(version)
+        if package is None:
+            manifest_path = self._manifest_paths[version]
+            # a refresh swaps the manifest repo with an updated copy, see commands._refresh_manifest_repo
+            # the manifests dir is app/package_name/ in the repo
+            with dir_lock(self.manifests_dir.parent.parent).read():
+                if not manifest_path.exists():
+                    raise FileNotFoundError(f"manifest '{manifest_path}' was removed, "
+                                            f"e.g. by a refresh of the manifest repo, search again")
+                package = Package.from_json(manifest_path)
             package.packages_meta = self
-        return packages
+            self._packages[version] = package
+        return package
+
+    def load_packages(self) -> "list":
+        """parse all manifests, prefer latest or get_version to only parse the manifest you need"""
+        return [self._load_package(version) for version in self._manifest_paths]
+
+    @property
+    def packages(self) -> "list":
+        """all Package instances, one for each version"""
+        return self.load_packages()
 
     def __repr__(self):
         if self.installed_package:
@@ -46,28 +84,43 @@ class PackagesMeta:
             return self.get_version(self.active_version)
 
         # get latest package
-        latest = [p for p in self.packages if p.version == "latest"]
-        if latest:
-            return latest[0]
+        if "latest" in self._manifest_paths:
+            return self._load_package("latest")
 
-        # sort by version
-        return sorted(self.packages, key=lambda x: x.version)[0]  # todo semver sort, todo test
+        # newest release, or the newest pre-release if there are no releases
+        if not self._sorted_versions:
+            return None
+        releases = [v for v in self._sorted_versions if not _version.is_prerelease(v)]
+        return self._load_package((releases or self._sorted_versions)[0])
 
     @property
     def versions(self):
-        return [x.version for x in self.packages]
+        """all versions, sorted newest first"""
+        return list(self._sorted_versions)
 
     def __getattr__(self, attr):
         """__getattr__ is called when the attr is not found on the instance
         try get the attr from the latest package, e.g. package_meta.install() == package_meta.latest.install()"""
         # todo remove this method later, will break lots of things though
+        if attr in ("_manifest_paths", "_packages", "_sorted_versions", "_app", "_package_name"):  # not set yet, avoid infinite recursion
+            raise AttributeError(attr)
         return getattr(self.latest, attr)
 
     def get_version(self, version: str) -> "plugget.data.package.Package | None":
-        """get package with matching version from self.packages"""
-        match = [x for x in self.packages if version == x.version]
-        if match:
-            return match[0]
+        """
+        get package with matching version from self.packages
+        version: an exact version e.g. '1.2.0', or a range e.g. '>=1.2,<2', which returns the newest match
+        """
+        if version in self._manifest_paths:
+            return self._load_package(version)
+        if _version.is_specifier(version):
+            versions = self.get_versions(version)
+            if versions:
+                return self._load_package(versions[0])
+
+    def get_versions(self, specifier: str) -> "list[str]":
+        """get all versions matching a range, e.g. '>=1.2,<2', sorted newest first"""
+        return _version.filter_versions(self._sorted_versions, specifier)
 
     @property
     def installed_packages(self) -> "typing.List[plugget.data.package.Package]":
@@ -77,7 +130,8 @@ class PackagesMeta:
         # instead they need to look in the app install folder for the package
         # but the same package can be multiple times installed in different apps.
 
-        return [x for x in self.packages if x.is_installed]
+        installed_versions = _registry.installed_versions(self._app, self._package_name)
+        return [self._load_package(v) for v in self._manifest_paths if v in installed_versions]
 
     @property
     def installed_package(self) -> "plugget.data.package.Package | None":
@@ -1,4 +1,5 @@
 from plugget import settings
+from plugget import _transport
 
 try:
     import requests
@@ -30,7 +31,6 @@ def get_starred_repos(username=None):
     Returns:
     a list of dicts, with full_name as key, and value user/my-repo
     """
-    # todo cache?
     username = username or GITHUB_USER
     token = GITHUB_TOKEN
 
@@ -40,7 +40,8 @@ def get_starred_repos(username=None):
     url = f"https://api.github.com/users/{username}/starred"
 
     try:
-        response = requests.get(url, headers=headers)
+        # conditional request, an unchanged list costs a 304 response instead of the full list
+        response = _transport.get(url, headers=headers)
         if response.ok:
             favorites = json.loads(response.text)
             return favorites
@@ -93,7 +94,7 @@ def get_repo_stars(repo_url, username=None):
     #     headers["Authorization"] = f"token {username}"
 
     # Make the API request
-    response = requests.get(api_url, headers=headers)
+    response = _transport.get(api_url, headers=headers)
     if response.ok:
         repo_data = response.json()
         return repo_data["stargazers_count"]
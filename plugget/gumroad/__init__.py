@@ -1,9 +1,9 @@
-import requests
 from bs4 import BeautifulSoup
+from plugget import _transport
 
 
 def get_gumroad_rating(url):
-    response = requests.get(url)
+    response = _transport.get(url)
     soup = BeautifulSoup(response.content, 'html.parser')
     rating_elem = soup.find('div', class_='rating')
     rating = rating_elem.find('div', class_='rating-average').text.strip()
@@ -11,13 +11,11 @@ def get_gumroad_rating(url):
 
 
 def get_products():
-    import requests
-
     access_token = "ACCESS_TOKEN"
     url = "https://api.gumroad.com/v2/products"
     headers = {"Authorization": f"Bearer {access_token}"}
 
-    response = requests.get(url, headers=headers)
+    response = _transport.get(url, headers=headers)
 
     if response.status_code == 200:
         products = response.json()
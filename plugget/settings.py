@@ -50,6 +50,18 @@ print("DEFAULT_PLUGGET_SETTINGS_PATH", DEFAULT_PLUGGET_SETTINGS_PATH)
 
 registered_settings_paths = set([DEFAULT_PLUGGET_SETTINGS_PATH, USER_SETTINGS_PATH])
 sources: set = set()  # set to avoid duplicate entries
+source_ttl: int = 24 * 60 * 60  # seconds a cloned manifest source stays fresh, before it's refreshed
+source_timeout: int = 120  # seconds before a git command for a manifest source is cancelled
+source_workers: int = 4  # max manifest sources fetched in parallel
+download_workers: int = 4  # max package downloads in parallel, when installing multiple packages
+cache_max_size: int = 10 * 1024 ** 3  # bytes, least recently used package content & wheels are removed above this size
+deploy_mode: str = "auto"  # how content is installed from the cache: auto (reflink or copy), hardlink or copy, see plugget._deploy
+http_timeout: int = 30  # seconds before a http request is cancelled, see plugget._transport
+http_retries: int = 3  # retries with backoff for failed http requests
+http_proxies: dict = {}  # requests proxies, e.g. {"https": "http://proxy:8080"}
+use_wheelhouse: bool = True  # pip install requirements from a local wheelhouse shared by all apps, see plugget._wheelhouse
+use_resolution_plans: bool = True  # cache the dependencies pip resolves for requirements, see plugget._plans
+plan_ttl: int = 7 * 24 * 60 * 60  # seconds a resolution plan is used, before resolving the requirements again
 
 
 def _load_json_settings(path: Path) -> dict:
@@ -84,9 +96,22 @@ def load_registered_settings() -> dict:
 
 def load_plugget_settings():
     """load all plugget settings (default, user)"""
-    global sources
+    global sources, source_ttl, source_timeout, source_workers, download_workers, cache_max_size, deploy_mode
+    global http_timeout, http_retries, http_proxies, use_wheelhouse, use_resolution_plans, plan_ttl
     settings_data = load_registered_settings()
     sources = set(settings_data.get("sources", []))
+    source_ttl = int(settings_data.get("source_ttl", source_ttl))
+    source_timeout = int(settings_data.get("source_timeout", source_timeout))
+    source_workers = int(settings_data.get("source_workers", source_workers))
+    download_workers = int(settings_data.get("download_workers", download_workers))
+    cache_max_size = int(settings_data.get("cache_max_size", cache_max_size))
+    deploy_mode = settings_data.get("deploy_mode", deploy_mode)
+    http_timeout = int(settings_data.get("http_timeout", http_timeout))
+    http_retries = int(settings_data.get("http_retries", http_retries))
+    http_proxies = dict(settings_data.get("http_proxies", http_proxies))
+    use_wheelhouse = bool(settings_data.get("use_wheelhouse", use_wheelhouse))
+    use_resolution_plans = bool(settings_data.get("use_resolution_plans", use_resolution_plans))
+    plan_ttl = int(settings_data.get("plan_ttl", plan_ttl))
 
 
 def save_user_settings(settings):
@@ -0,0 +1,37 @@
+"""
+shared test setup
+plugget saves to APPDATA & the temp folder on import, so point them to a fresh folder before importing plugget
+"""
+
+import functools
+import http.server
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+import pytest
+
+_TEST_ROOT = Path(tempfile.mkdtemp(prefix="plugget_tests_"))
+os.environ["APPDATA"] = str(_TEST_ROOT / "appdata")
+(_TEST_ROOT / "temp").mkdir()
+tempfile.tempdir = str(_TEST_ROOT / "temp")
+
+
+class _Handler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        self.server.requests.append((self.command, self.path, self.headers.get("Range"), args[1] if args else None))
+
+
+@pytest.fixture
+def http_server(tmp_path):
+    """serve a folder over http, yields (base url, served folder, list of (method, path, range, status))"""
+    www = tmp_path / "www"
+    www.mkdir()
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(_Handler, directory=str(www)))
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}", www, server.requests
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,58 @@
+import gzip
+import json
+
+from plugget import _catalog, _index
+
+
+def _make_manifest_repo(path):
+    for app, package_name, version in [("blender", "bqt", "0.1.0"), ("blender", "bqt", "0.2.0"),
+                                       ("maya", "unimenu", "1.0.0")]:
+        manifest_path = path / app / package_name / f"{version}.json"
+        manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        manifest_path.write_text(json.dumps({"repo_url": f"https://github.com/x/{package_name}",
+                                             "description": f"{package_name} {version}"}))
+    return path
+
+
+def test_catalog_round_trip(tmp_path, http_server):
+    url, www, requests = http_server
+    _catalog.build_catalog(_make_manifest_repo(tmp_path / "repo"), www / "pkgs.jsonl.gz")
+    source_dir = tmp_path / "source"
+
+    _catalog.fetch_catalog(f"{url}/pkgs.jsonl.gz", source_dir)
+
+    assert json.loads((source_dir / "blender" / "bqt" / "0.2.0.json").read_text())["description"] == "bqt 0.2.0"
+    assert (source_dir / "maya" / "unimenu" / "1.0.0.json").exists()
+    entries = _index.load_index(source_dir)
+    assert sorted((e["app"], e["package_name"], e["version"]) for e in entries) == [
+        ("blender", "bqt", "0.1.0"), ("blender", "bqt", "0.2.0"), ("maya", "unimenu", "1.0.0")]
+
+    # the second fetch is a conditional request, the server replies 304 and nothing is rewritten
+    last_commit = (source_dir / "_LAST_COMMIT").stat().st_mtime_ns
+    _catalog.fetch_catalog(f"{url}/pkgs.jsonl.gz", source_dir)
+    assert [r[3] for r in requests] == ["200", "304"]
+    assert (source_dir / "_LAST_COMMIT").stat().st_mtime_ns == last_commit
+
+
+def test_catalog_skips_unsafe_names(tmp_path, http_server):
+    url, www, requests = http_server
+    lines = [{"app": "blender", "package_name": "ok", "version": "1.0.0", "manifest": {}},
+             {"app": "..", "package_name": "..", "version": "evil", "manifest": {}},
+             {"app": "blender", "package_name": "../../evil", "version": "1.0.0", "manifest": {}},
+             {"app": "blender", "package_name": "evil", "version": "../../../1.0.0", "manifest": {}}]
+    (www / "pkgs.jsonl.gz").write_bytes(gzip.compress("\n".join(json.dumps(x) for x in lines).encode()))
+    source_dir = tmp_path / "sources" / "source"
+
+    _catalog.fetch_catalog(f"{url}/pkgs.jsonl.gz", source_dir)
+
+    assert (source_dir / "blender" / "ok" / "1.0.0.json").exists()
+    written = [p for p in (tmp_path / "sources").rglob("*.json") if not p.name.startswith("_")]
+    assert written == [source_dir / "blender" / "ok" / "1.0.0.json"]
+    assert [e["package_name"] for e in _index.load_index(source_dir)] == ["ok"]
+
+
+def test_catalog_source_dir_name():
+    # a catalog doesn't share a folder with a git source, or another catalog with the same name
+    name = _catalog.source_dir_name("https://example.com/plugget-pkgs.jsonl.gz")
+    assert name.startswith("plugget-pkgs_")
+    assert name != _catalog.source_dir_name("https://other.com/plugget-pkgs.jsonl.gz")
@@ -0,0 +1,47 @@
+"""tests for deploying package content as a diff with the previous install"""
+
+import os
+
+from plugget import _deploy
+
+
+def _write(root, files: dict):
+    for relative_path, text in files.items():
+        path = root / relative_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+
+
+def _read(root) -> dict:
+    return {p.relative_to(root).as_posix(): p.read_text() for p in root.rglob("*") if p.is_file()}
+
+
+def test_sync_deploys_the_diff(tmp_path):
+    v1, v2, dst = tmp_path / "v1", tmp_path / "v2", tmp_path / "addons" / "my_addon"
+    _write(v1, {"__init__.py": "v1", "same.py": "same", "edited.py": "edited", "old/removed.py": "removed"})
+    _write(v2, {"__init__.py": "v2", "same.py": "same", "edited.py": "edited", "new/added.py": "added"})
+
+    ledger = _deploy.sync(v1, dst, mode="copy")
+    assert _read(dst) == _read(v1)
+    assert all(entry["sha256"] is None for entry in ledger.values())  # a fresh install doesn't hash
+
+    (dst / "edited.py").write_text("edited by the user")
+    (dst / "settings.json").write_text("{}")  # not installed by us
+    same_stat = os.stat(dst / "same.py")
+
+    ledger = _deploy.sync(v2, dst, previous=ledger, mode="copy")
+    assert _read(dst) == {**_read(v2), "settings.json": "{}"}
+    assert not (dst / "old").exists()
+    assert os.stat(dst / "same.py").st_ino == same_stat.st_ino  # unchanged files aren't deployed again
+    assert os.stat(dst / "same.py").st_mtime_ns == same_stat.st_mtime_ns
+    assert ledger == {relative_path: {"sha256": file_hash, "stat": _deploy._stat(dst / relative_path)}
+                      for relative_path, file_hash in _deploy.hash_files(v2).items()}
+
+
+def test_sync_replaces_a_deleted_install(tmp_path):
+    src, dst = tmp_path / "src", tmp_path / "dst"
+    _write(src, {"a.py": "a"})
+    ledger = _deploy.sync(src, dst, mode="copy")
+    (dst / "a.py").unlink()
+    _deploy.sync(src, dst, previous=ledger, mode="copy")
+    assert _read(dst) == {"a.py": "a"}
@@ -0,0 +1,83 @@
+import json
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from plugget import _index
+from plugget.commands import _get_index_entries
+
+
+def _write_manifest(source_dir, app, package_name, version, description):
+    manifest_path = source_dir / app / package_name / f"{version}.json"
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    manifest_path.write_text(json.dumps({"repo_url": f"https://github.com/x/{package_name}",
+                                         "description": description}))
+    return manifest_path
+
+
+def _descriptions(entries):
+    return {entry["package_name"]: entry["description"] for entry in entries}
+
+
+def test_index_rebuilds_on_manifest_edit(tmp_path):
+    source_dir = tmp_path / "source"
+    manifest_path = _write_manifest(source_dir, "blender", "bqt", "0.1.0", "qt in blender")
+    _write_manifest(source_dir, "blender", "textools", "1.0.0", "uv tools")
+    assert _descriptions(_get_index_entries(source_dir)) == {"bqt": "qt in blender", "textools": "uv tools"}
+    assert _index.load_index(source_dir) is not None
+
+    # edit the manifest in place, the package folder's mtime doesn't change
+    folder_mtime = manifest_path.parent.stat().st_mtime_ns
+    manifest_path.write_text(json.dumps({"description": "pyside in blender"}))
+    os.utime(manifest_path.parent, ns=(folder_mtime, folder_mtime))
+    assert _index.load_index(source_dir) is None
+    assert _descriptions(_get_index_entries(source_dir))["bqt"] == "pyside in blender"
+
+    # same size, only the modified time changes
+    stat = manifest_path.stat()
+    manifest_path.write_text(json.dumps({"description": "PySide in blender"}))
+    os.utime(manifest_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert _descriptions(_get_index_entries(source_dir))["bqt"] == "PySide in blender"
+
+
+def test_index_rebuilds_on_new_version(tmp_path):
+    source_dir = tmp_path / "source"
+    _write_manifest(source_dir, "blender", "bqt", "0.1.0", "qt in blender")
+    assert [e["version"] for e in _get_index_entries(source_dir)] == ["0.1.0"]
+    _write_manifest(source_dir, "blender", "bqt", "0.2.0", "qt in blender")
+    assert sorted(e["version"] for e in _get_index_entries(source_dir)) == ["0.1.0", "0.2.0"]
+
+
+def test_rank_prefix_and_full_matches(tmp_path):
+    source_dir = tmp_path / "source"
+    _write_manifest(source_dir, "blender", "textools", "1.0.0", "uv tools")
+    _write_manifest(source_dir, "blender", "texel", "1.0.0", "texel density")
+    _write_manifest(source_dir, "blender", "bqt", "1.0.0", "qt in blender")
+    _get_index_entries(source_dir)
+
+    scores = _index.rank(source_dir, "tex")
+    assert set(scores) == {"blender/textools", "blender/texel"}
+    # a full token match scores higher than a prefix match
+    assert _index.rank(source_dir, "texel")["blender/texel"] > scores["blender/texel"]
+    # every query token has to match
+    assert set(_index.rank(source_dir, "tex uv")) == {"blender/textools"}
+    assert _index.rank(source_dir, "zzz") == {}
+
+
+def test_index_rebuilds_on_uncommitted_manifest(tmp_path):
+    if not shutil.which("git"):
+        pytest.skip("git not found")
+    source_dir = tmp_path / "source"
+    manifest_path = _write_manifest(source_dir, "blender", "bqt", "0.1.0", "qt in blender")
+    git = ["git", "-C", str(source_dir), "-c", "user.email=test@example.com", "-c", "user.name=test"]
+    subprocess.run(git + ["init", "--quiet"], check=True)
+    subprocess.run(git + ["add", "-A"], check=True)
+    subprocess.run(git + ["commit", "--quiet", "-m", "init"], check=True)
+    assert _descriptions(_get_index_entries(source_dir)) == {"bqt": "qt in blender"}
+
+    # a local manifest repo, edited without committing
+    manifest_path.write_text(json.dumps({"description": "pyside in blender"}))
+    _write_manifest(source_dir, "blender", "new_tool", "1.0.0", "new")
+    assert _descriptions(_get_index_entries(source_dir)) == {"bqt": "pyside in blender", "new_tool": "new"}
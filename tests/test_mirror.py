@@ -0,0 +1,57 @@
+"""tests for the local repo mirrors, with a local git repo"""
+
+import shutil
+import subprocess
+
+import pytest
+
+from plugget import _mirror
+
+pytestmark = pytest.mark.skipif(not shutil.which("git"), reason="git not found")
+
+
+def _git(repo, *args) -> str:
+    command = ["git", "-C", str(repo), "-c", "user.email=test@example.com", "-c", "user.name=test", *args]
+    return subprocess.run(command, check=True, stdout=subprocess.PIPE).stdout.decode().strip()
+
+
+@pytest.fixture
+def repo(tmp_path):
+    repo = tmp_path / "my_plugin"
+    (repo / "my_plugin").mkdir(parents=True)
+    (repo / "my_plugin" / "__init__.py").write_text("version = 1\n")
+    (repo / "docs").mkdir()
+    (repo / "docs" / "readme.md").write_text("docs\n")
+    (repo / "requirements.txt").write_text("requests\n")
+    _git(repo, "init", "--quiet")
+    _git(repo, "config", "uploadpack.allowFilter", "true")
+    _git(repo, "config", "uploadpack.allowAnySHA1InWant", "true")
+    _git(repo, "add", "-A")
+    _git(repo, "commit", "--quiet", "-m", "v1")
+    _git(repo, "tag", "v1.0")
+    return repo
+
+
+def test_export_versions_from_mirror(repo, tmp_path):
+    repo_url = repo.as_uri()
+
+    v1_dir = tmp_path / "v1"
+    _mirror.export(repo_url, "tags/v1.0", v1_dir, paths=["my_plugin"])
+    assert sorted(p.relative_to(v1_dir).as_posix() for p in v1_dir.rglob("*") if p.is_file()) == [
+        "my_plugin/__init__.py", "requirements.txt"]
+
+    (repo / "my_plugin" / "__init__.py").write_text("version = 2\n")
+    _git(repo, "commit", "--quiet", "-am", "v2")
+    commit = _git(repo, "rev-parse", "HEAD")
+
+    v2_dir = tmp_path / "v2"
+    _mirror.export(repo_url, commit, v2_dir)
+    assert (v2_dir / "my_plugin" / "__init__.py").read_text() == "version = 2\n"
+    assert (v2_dir / "docs" / "readme.md").exists()
+    assert not (v2_dir / ".git").exists()
+    # both versions are in the same mirror
+    assert _mirror._has_commit(_mirror.mirror_dir(repo_url), "tags/v1.0")
+    assert _mirror._has_commit(_mirror.mirror_dir(repo_url), commit)
+
+    with pytest.raises(Exception, match="not found"):
+        _mirror.export(repo_url, commit, tmp_path / "missing", paths=["not_a_folder"])
@@ -0,0 +1,77 @@
+"""tests for fetching & deploying package content"""
+
+import os
+import shutil
+import subprocess
+
+import pytest
+
+import plugget.cache
+from plugget import _deploy
+from plugget.data.package import Package
+
+
+def _cached_package(tmp_path, monkeypatch):
+    """a package with its content in the content cache, without downloading it"""
+    content = tmp_path / "download"
+    (content / "my_addon").mkdir(parents=True)
+    (content / "my_addon" / "__init__.py").write_text("bl_info = {}\n")
+    (content / "my_addon" / "icons.dat").write_bytes(b"x" * 1000)
+    repo_url = "https://example.com/me/my_addon.git"
+    cached_dir = plugget.cache.add(repo_url, "1a2b3c", content)
+
+    package = Package(app="blender", package_name="my_addon", version="1.0.0", repo_url=repo_url,
+                      repo_paths=["my_addon"])
+    package._clone_dir = tmp_path / "clone" / "my_addon"
+    monkeypatch.setattr(package, "_get_cached_content", lambda: cached_dir)
+    return package, cached_dir
+
+
+def test_content_is_copied_once(tmp_path, monkeypatch):
+    package, cached_dir = _cached_package(tmp_path, monkeypatch)
+    copies = []
+    monkeypatch.setattr(_deploy.shutil, "copy2", lambda src, dst: copies.append(src) or shutil.copy(src, dst))
+
+    addon_path, = package.get_content()
+    assert copies == []  # the clone dir links to the cache
+    assert os.stat(addon_path / "icons.dat").st_ino == os.stat(cached_dir / "my_addon" / "icons.dat").st_ino
+
+    package.deploy(addon_path, tmp_path / "addons" / "my_addon")
+    assert len(copies) <= 2  # each file is copied at most once, to the app (none if reflinked)
+    assert (tmp_path / "addons" / "my_addon" / "icons.dat").read_bytes() == b"x" * 1000
+
+    # actions can rename files in the clone dir, without changing the cache
+    (addon_path / "icons.dat").rename(addon_path / "icons.bin")
+    assert (cached_dir / "my_addon" / "icons.dat").exists()
+
+
+@pytest.fixture
+def git_repo(tmp_path):
+    if not shutil.which("git"):
+        pytest.skip("git not found")
+    repo = tmp_path / "repo"
+    (repo / "my_addon").mkdir(parents=True)
+    (repo / "my_addon" / "__init__.py").write_text("bl_info = {}\n")
+    git = ["git", "-C", str(repo), "-c", "user.email=test@example.com", "-c", "user.name=test"]
+    subprocess.run(git + ["init", "--quiet"], check=True)
+    subprocess.run(git + ["config", "uploadpack.allowFilter", "true"], check=True)
+    subprocess.run(git + ["add", "-A"], check=True)
+    subprocess.run(git + ["commit", "--quiet", "-m", "v1"], check=True)
+    subprocess.run(git + ["tag", "v1.0"], check=True)
+    return repo
+
+
+def test_checksum_of_non_github_repo(git_repo, tmp_path):
+    (tmp_path / "expected").mkdir()
+    shutil.copytree(git_repo / "my_addon", tmp_path / "expected" / "my_addon")
+    expected = _deploy.content_sha256(tmp_path / "expected")
+
+    package = Package(app="blender", package_name="my_addon", version="1.0.0", repo_url=git_repo.as_uri(),
+                      repo_tag="v1.0", repo_paths=["my_addon"], sha256=expected)
+    package._download_repo(tmp_path / "ok", ref=package._resolve_repo_ref())
+    assert (tmp_path / "ok" / "my_addon" / "__init__.py").exists()
+
+    package.sha256 = "0" * 64
+    with pytest.raises(Exception, match="checksum mismatch"):
+        package._download_repo(tmp_path / "corrupt", ref=package._resolve_repo_ref())
+    assert not (tmp_path / "corrupt").exists()
@@ -0,0 +1,29 @@
+"""tests for cached resolution plans"""
+
+from plugget import _plans
+
+
+def test_pins_from_report():
+    report = {"install": [
+        {"metadata": {"name": "requests", "version": "2.31.0"}, "is_direct": False,
+         "download_info": {"url": "https://files.example.com/requests-2.31.0-py3-none-any.whl"}},
+        {"metadata": {"name": "my-tool", "version": "0.1"}, "is_direct": True,
+         "download_info": {"url": "https://github.com/me/my-tool", "subdirectory": "src",
+                           "vcs_info": {"vcs": "git", "commit_id": "1a2b3c", "requested_revision": "main"}}},
+        {"metadata": {"name": "local-lib", "version": "1.0"}, "is_direct": True,
+         "download_info": {"url": "file:///libs/local_lib", "dir_info": {}}},
+    ]}
+    assert _plans.pins_from_report(report) == [
+        "requests==2.31.0",
+        "my-tool @ git+https://github.com/me/my-tool@1a2b3c#subdirectory=src",
+        "local-lib @ file:///libs/local_lib",
+    ]
+    assert _plans.pins_from_report({}) == []
+
+
+def test_plan_is_keyed_on_the_normalized_requirement_set():
+    _plans.add(["Py_Pip>=1.0", "requests"], ["py-pip==1.2", "requests==2.31.0"])
+    assert _plans.get(["requests", "py-pip>=1.0"]) == ["py-pip==1.2", "requests==2.31.0"]
+    assert _plans.get(["requests"]) is None
+    _plans.remove(["requests", "py-pip>=1.0"])
+    assert _plans.get(["Py_Pip>=1.0", "requests"]) is None
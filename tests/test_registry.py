@@ -0,0 +1,14 @@
+import concurrent.futures
+
+from plugget import _registry
+
+
+def test_parallel_add_and_remove():
+    app, app_hash = "test_app", "registry_test"
+    with concurrent.futures.ThreadPoolExecutor(8) as executor:
+        list(executor.map(lambda i: _registry.add(app, f"pkg{i}", "1.0.0", app_hash=app_hash), range(100)))
+    assert len(_registry.load(app, app_hash)) == 100
+
+    with concurrent.futures.ThreadPoolExecutor(8) as executor:
+        list(executor.map(lambda i: _registry.remove(app, f"pkg{i}", app_hash=app_hash), range(0, 100, 2)))
+    assert sorted(_registry.load(app, app_hash)) == sorted(f"pkg{i}" for i in range(1, 100, 2))
@@ -0,0 +1,58 @@
+"""tests for the requirements action, without starting pip"""
+
+import os
+
+import pytest
+
+from plugget.data.package import Package
+from plugget.actions import _requirements
+
+
+def _package(tmp_path, app, name, requirements):
+    package = Package(app=app, package_name=name, version="1.0.0", repo_url="https://example.com/repo.git")
+    package._clone_dir = tmp_path / app / name
+    package._clone_dir.mkdir(parents=True)
+    (package._clone_dir / "requirements.txt").write_text("\n".join(requirements) + "\n")
+    package.get_content = lambda *args, **kwargs: []  # content is already "downloaded"
+    return package
+
+
+class _Action(_requirements.RequirementsAction):
+    installs = []
+
+    @classmethod
+    def setup_py_pip(cls):
+        pass
+
+    @classmethod
+    def _install_requirements(cls, requirements, force=False):
+        cls.installs.append(requirements)
+
+
+def test_dependency_requirements_install_once(tmp_path):
+    parent = _package(tmp_path, "blender", "parent", ["alpha"])
+    dependency = _package(tmp_path, "blender", "dependency", ["beta"])
+    other_app = _package(tmp_path, "maya", "other", ["gamma"])
+    parent._dependency_packages = [dependency, other_app]
+
+    assert _requirements.get_dependency_packages(parent) == [dependency]
+
+    _Action.install(parent)
+    _Action.install(dependency)  # installed with the parent, so pip isn't started again
+    assert _Action.installs == [["alpha", "beta"]]
+
+
+@pytest.mark.skipif(os.name == "nt", reason="fake interpreter is a shell script")
+def test_markers_use_the_target_interpreter(tmp_path):
+    interpreter = tmp_path / "python2"
+    interpreter.write_text('#!/bin/sh\necho \'{"python_version": "2.7"}\'\n')
+    interpreter.chmod(0o755)
+    target = tmp_path / "site-packages"
+    target.mkdir()
+
+    requirements = ['alpha; python_version < "3"']
+    assert _requirements.get_unsatisfied_requirements(requirements, target) == []
+    assert _requirements.get_unsatisfied_requirements(requirements, target, interpreter) == requirements
+    # pip checks the requirements if we can't run the interpreter
+    missing = tmp_path / "missing_python"
+    assert _requirements.get_unsatisfied_requirements(requirements, target, missing) == requirements
@@ -0,0 +1,72 @@
+import json
+import subprocess
+import threading
+
+from plugget import commands
+from plugget._utils import dir_lock
+
+
+def _git(cwd, *args):
+    subprocess.run(["git", "-c", "user.email=test@plugget", "-c", "user.name=test", *args], cwd=cwd, check=True,
+                   stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+
+def _commit_manifests(repo, count, description):
+    for i in range(count):
+        manifest_path = repo / "blender" / f"pkg{i}" / "1.0.0.json"
+        manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        manifest_path.write_text(json.dumps({"repo_url": f"https://github.com/x/pkg{i}", "description": description}))
+    _git(repo, "add", "-A")
+    _git(repo, "commit", "-q", "-m", description)
+
+
+def test_refresh_swaps_in_updated_repo(tmp_path, monkeypatch):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    _git(repo, "init", "-q")
+    _commit_manifests(repo, 50, "v1")
+    source_url, source_dir = repo.as_uri(), tmp_path / "source"
+
+    commands._refresh_manifest_repo(source_url, source_dir)
+    manifest_path = source_dir / "blender" / "pkg0" / "1.0.0.json"
+    assert json.loads(manifest_path.read_text())["description"] == "v1"
+
+    # read the manifests while the repo is refreshed, they're never missing or half written
+    errors = []
+    stop = threading.Event()
+
+    def read():
+        while not stop.is_set():
+            # read the manifests of one revision, like a search
+            with dir_lock(source_dir).read():
+                for i in range(50):
+                    try:
+                        json.loads((source_dir / "blender" / f"pkg{i}" / "1.0.0.json").read_text())
+                    except Exception as e:
+                        errors.append(e)
+
+    git_commands = []
+    run_git = commands._run_git
+    monkeypatch.setattr(commands, "_run_git", lambda command, *args, **kwargs:
+                        git_commands.append(command[1]) or run_git(command, *args, **kwargs))
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    try:
+        for version in ["v2", "v3"]:
+            _commit_manifests(repo, 50, version)
+            commands._refresh_manifest_repo(source_url, source_dir)
+    finally:
+        stop.set()
+        reader.join()
+
+    assert not errors
+    assert json.loads(manifest_path.read_text())["description"] == "v3"
+    head = subprocess.run(["git", "rev-parse", "HEAD"], cwd=repo, stdout=subprocess.PIPE).stdout.decode().strip()
+    assert (source_dir / "_LAST_COMMIT").read_text() == head
+    assert not source_dir.with_name("source_new").exists()
+    # only new commits are fetched, the repo isn't cloned again
+    assert "clone" not in git_commands and git_commands.count("fetch") == 2
+    status = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=source_dir,
+                            stdout=subprocess.PIPE).stdout.decode()
+    assert status == ""
@@ -0,0 +1,87 @@
+"""tests for resumable downloads, with a local http server that supports Range requests"""
+
+import hashlib
+import http.server
+import json
+import threading
+import zipfile
+
+import pytest
+
+from plugget import _transport, _utils
+
+BODY = bytes(range(256)) * 64
+ETAG = '"v1"'
+
+
+class _RangeHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.requests.append(self.headers.get("Range"))
+        body, status = BODY, 200
+        range_header = self.headers.get("Range")
+        if range_header and self.headers.get("If-Range", ETAG) == ETAG:
+            start = int(range_header.split("=")[1].rstrip("-"))
+            if start >= len(BODY):
+                self.send_response(416)
+                self.end_headers()
+                return
+            body, status = BODY[start:], 206
+        self.send_response(status)
+        self.send_header("ETag", ETAG)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def url():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _RangeHandler)
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/package.zip", server.requests
+    server.shutdown()
+    server.server_close()
+
+
+def test_download_resumes_partial_file(url, tmp_path):
+    url, requests = url
+    path = tmp_path / "package.zip"
+    # an interrupted download of the same file
+    (tmp_path / "package.zip.part").write_bytes(BODY[:1000])
+    (tmp_path / "package.zip.part.json").write_text(json.dumps({"url": url, "etag": ETAG}))
+
+    _transport.download(url, path, sha256=hashlib.sha256(BODY).hexdigest())
+    assert path.read_bytes() == BODY
+    assert requests == ["bytes=1000-"]
+    assert not (tmp_path / "package.zip.part").exists()
+    assert not (tmp_path / "package.zip.part.json").exists()
+
+
+def test_download_checksum_mismatch(url, tmp_path):
+    url, requests = url
+    path = tmp_path / "package.zip"
+    with pytest.raises(Exception, match="checksum mismatch"):
+        _transport.download(url, path, sha256="0" * 64)
+    assert not path.exists()
+    assert not (tmp_path / "package.zip.part").exists()  # a corrupt download isn't resumed
+
+
+def test_github_zip_missing_repo_paths(http_server, tmp_path, monkeypatch):
+    base_url, www, requests = http_server
+    with zipfile.ZipFile(www / "repo.zip", "w") as zip_file:
+        zip_file.writestr("repo-main/my_addon/__init__.py", "bl_info = {}\n")
+        zip_file.writestr("repo-main/requirements.txt", "requests\n")
+    monkeypatch.setattr(_utils, "_archive_url", lambda *args, **kwargs: f"{base_url}/repo.zip")
+
+    _utils.download_github_repo("https://github.com/me/repo", tmp_path / "ok", paths=["my_addon"])
+    assert (tmp_path / "ok" / "my_addon" / "__init__.py").exists()
+
+    # the root requirements.txt doesn't count as a match
+    with pytest.raises(Exception, match="not_a_folder"):
+        _utils.download_github_repo("https://github.com/me/repo", tmp_path / "missing",
+                                    paths=["my_addon", "not_a_folder"])
+    assert not any((tmp_path / "missing").iterdir())
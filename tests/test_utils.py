@@ -0,0 +1,31 @@
+"""tests for the background trash"""
+
+import threading
+
+from plugget import _utils
+
+
+def _wait_for_trash(timeout=10) -> bool:
+    thread = threading.Thread(target=_utils.wait_for_trash, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    return not thread.is_alive()
+
+
+def test_trash_survives_errors(tmp_path, monkeypatch):
+    def fail(path):
+        raise RuntimeError("unexpected")
+
+    monkeypatch.setattr(_utils, "_rmtree", fail)
+    (tmp_path / "a" / "sub").mkdir(parents=True)
+    _utils.rmdir(tmp_path / "a")
+    assert not (tmp_path / "a").exists()  # moved to the trash right away
+    assert _wait_for_trash()
+
+    # the trash thread still deletes folders after an error
+    monkeypatch.undo()
+    (tmp_path / "b" / "sub").mkdir(parents=True)
+    _utils.rmdir(tmp_path / "b")
+    assert _wait_for_trash()
+    assert _utils._trash_thread.is_alive()
+    assert not [p for p in _utils._trash_dir().iterdir() if p.name.startswith("b_")]
@@ -0,0 +1,57 @@
+import pytest
+
+from plugget import _version
+
+
+def test_sort_versions():
+    versions = ["1.0.0", "main", "v2.0.0", "1.10.0", "1.2.0", "2.0.0-beta.1", "2.0.0-alpha", "1.0rc2", "2.0.0-beta.2"]
+    assert _version.sort_versions(versions) == [
+        "v2.0.0", "2.0.0-beta.2", "2.0.0-beta.1", "2.0.0-alpha", "1.10.0", "1.2.0", "1.0.0", "1.0rc2", "main"]
+
+
+def test_equal_versions():
+    assert _version.version_key("1.0.0") == _version.version_key("1.0") == _version.version_key("v1")
+    assert _version.version_key("1.0.0+build.5") == _version.version_key("1.0.0")
+
+
+@pytest.mark.parametrize("specifier, expected", [
+    (">=1.2,<2", ["1.2.0", "1.10.0"]),
+    ("==1.2", ["1.2.0"]),
+    ("!=1.2.0", ["1.0.0", "1.10.0", "2.0.0", "2.1.0", "main"]),
+    ("~=1.2", ["1.2.0", "1.10.0"]),
+    ("~=1.2.0", ["1.2.0"]),
+    ("~=v1.2", ["1.2.0", "1.10.0"]),
+    ("~=1.0", ["1.0.0", "1.2.0", "1.10.0"]),
+    ("~=2.0rc1", ["2.0.0", "2.1.0"]),
+    (">2.1", []),
+])
+def test_filter_versions(specifier, expected):
+    versions = ["1.0.0", "1.2.0", "1.10.0", "2.0.0", "2.1.0", "main"]
+    assert _version.filter_versions(versions, specifier) == expected
+
+
+def test_prereleases_only_match_without_releases():
+    assert _version.filter_versions(["1.0.0", "2.0.0-beta"], ">1") == ["2.0.0-beta"]
+    assert _version.filter_versions(["2.0.0", "2.1.0-beta"], ">=2") == ["2.0.0"]
+    assert _version.filter_versions(["1.4rc1", "1.4", "1.5"], "~=1.4rc1") == ["1.4", "1.5"]
+    # a compatible release excludes pre-releases of the next version
+    assert _version.filter_versions(["1.4.0-rc1", "1.5.0-rc1"], "~=1.4.0-rc1") == ["1.4.0-rc1"]
+
+
+def test_invalid_compatible_release():
+    with pytest.raises(ValueError):
+        _version.filter_versions(["1.0.0"], "~=1")
+    with pytest.raises(ValueError):
+        _version.filter_versions(["1.0.0"], "~=main")
+
+
+def test_post_and_dev_releases():
+    versions = ["1.0rc1", "1.0.post1", "1.0.dev1", "1.0", "1.0.post2.dev1", "1.0rc1.dev1", "1.1.dev0", "1.0.dev2"]
+    assert _version.sort_versions(versions) == [
+        "1.1.dev0", "1.0.post2.dev1", "1.0.post1", "1.0", "1.0rc1", "1.0rc1.dev1", "1.0.dev2", "1.0.dev1"]
+    assert not _version.is_prerelease("1.0.post1")
+    assert _version.is_prerelease("1.0.dev1")
+    assert _version.is_prerelease("1.0.post1.dev1")
+    # a post release is the latest release, a dev release only if there's no release
+    assert _version.filter_versions(["1.0", "1.0.post1", "1.1.dev0"], ">=1") == ["1.0", "1.0.post1"]
+    assert _version.filter_versions(["1.4", "1.5.dev0", "1.5rc1"], "~=1.4") == ["1.4"]
@@ -0,0 +1,23 @@
+"""tests for the shared wheelhouse"""
+
+import os
+
+from plugget import _wheelhouse
+
+
+def test_prune_removes_least_recently_used_wheels():
+    wheel_dir = _wheelhouse.wheel_dir()
+    names = ["alpha-1.0-py3-none-any.whl", "beta-1.0-py3-none-any.whl", "py_pip-0.1-py3-none-any.whl"]
+    for i, name in enumerate(names):
+        path = wheel_dir / name
+        path.write_bytes(b"x" * 100)
+        os.utime(path, (1000 + i, 1000 + i))
+
+    # alpha is oldest, but was just installed again
+    used = _wheelhouse.mark_used(["alpha-1.0", "py-pip-0.1", "gamma-2.0"])
+    assert sorted(p.name for p in used) == [names[0], names[2]]
+
+    removed = _wheelhouse.prune(max_size=250)
+    assert [p.name for p in removed] == [names[1]]
+    assert [p.name for p in _wheelhouse.wheels()] == [names[0], names[2]]
+    _wheelhouse.clear()